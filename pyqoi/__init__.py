@@ -6,19 +6,96 @@ from .pyqoi import (
     decode,
     read,
     write,
+    read_header,
+    validate,
+    encode_array,
+    decode_array,
+    convert_channels,
+    encode_into,
+    max_encoded_size,
     QOI_SRGB,
     QOI_LINEAR
 )
+from .vectorized import encode_vectorized, decode_vectorized
+from .image import QoiImage
+from .thumbnail import decode_thumbnail
+from .stats import QoiStats
+from .pool import QoiBufferPool
+from .cache import QoiCache
+from .stream import QoiEncoder, QoiDecoder
+from .seek import (
+    QoiSeekIndex,
+    build_index,
+    write_indexed,
+    decode_rows,
+    decode_parallel,
+)
+from .striped import (
+    encode_striped,
+    decode_striped,
+    join_striped,
+    write_striped,
+    read_striped,
+)
+from .sequence import QoiSequenceWriter, QoiSequenceReader
+from .aio import aencode, adecode, aread, awrite, amap
+from .batch import (
+    BatchResult,
+    encode_many,
+    decode_many,
+    convert_tree,
+    validate_many,
+    scan_tree,
+)
 
 __version__ = "0.1.0"
 __all__ = [
     "QoiHeader",
     "RGBA",
     "QoiRGBA",
+    "QoiImage",
+    "QoiStats",
+    "QoiBufferPool",
+    "QoiCache",
+    "QoiEncoder",
+    "QoiDecoder",
+    "QoiSeekIndex",
+    "QoiSequenceWriter",
+    "QoiSequenceReader",
+    "BatchResult",
     "encode",
     "decode",
     "read", 
     "write",
+    "read_header",
+    "validate",
+    "encode_array",
+    "decode_array",
+    "decode_thumbnail",
+    "convert_channels",
+    "encode_into",
+    "max_encoded_size",
+    "encode_vectorized",
+    "decode_vectorized",
+    "aencode",
+    "adecode",
+    "aread",
+    "awrite",
+    "amap",
+    "encode_many",
+    "decode_many",
+    "convert_tree",
+    "validate_many",
+    "scan_tree",
+    "build_index",
+    "write_indexed",
+    "decode_rows",
+    "decode_parallel",
+    "encode_striped",
+    "decode_striped",
+    "join_striped",
+    "write_striped",
+    "read_striped",
     "QOI_SRGB",
     "QOI_LINEAR"
 ]
\ No newline at end of file
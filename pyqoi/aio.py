@@ -0,0 +1,166 @@
+##### IMPORTS #######
+from concurrent.futures import Executor
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple
+import asyncio
+
+from .pyqoi import QoiHeader, encode, decode, read, write
+
+
+##### Util Functions ####
+def _copy_header(src: QoiHeader, dst: QoiHeader) -> None:
+    dst.width, dst.height = src.width, src.height
+    dst.channels, dst.colorspace = src.channels, src.colorspace
+
+# decode and read populate desc in place, which a process executor would
+# do on a copy; these run in the worker and send the header back instead
+def _decode_with_header(data: bytes, size: int, channels: int) -> Tuple[bytes, QoiHeader]:
+    desc = QoiHeader(0, 0, 0, 0)
+    return decode(data, size, desc, channels), desc
+
+def _read_with_header(filename: str, channels: int) -> Tuple[bytes, QoiHeader]:
+    desc = QoiHeader(0, 0, 0, 0)
+    return read(filename, desc, channels), desc
+
+async def _aiter(jobs):
+    if hasattr(jobs, "__aiter__"):
+        async for job in jobs:
+            yield job
+    else:
+        for job in jobs:
+            yield job
+
+
+##### IO #################
+async def aencode(
+    data: bytes, desc: QoiHeader, out_len: int, executor: Optional[Executor] = None
+) -> Tuple[bytearray, int]:
+    """Runs encode in an executor without blocking the event loop
+
+    Args:
+        data (bytes): Raw RGB/RGBA data
+        desc (QoiHeader): QoiHeader data
+        out_len (int): Raw RGB/RGBA  data length
+        executor (Optional[Executor]): Thread or process pool to run in,
+            None for the loop's default thread pool. The codec holds the
+            GIL, so a ProcessPoolExecutor is needed to use several cores.
+
+    Returns:
+        Tuple[bytearray, int]: encoded data and its length
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, encode, data, desc, out_len)
+
+async def adecode(
+    data: bytes, size: int, desc: QoiHeader, channels: int = 0, executor: Optional[Executor] = None
+) -> bytes:
+    """Runs decode in an executor without blocking the event loop
+
+    Args:
+        data (bytes): QOI encoded data
+        size (int): Size of the encoded data
+        desc (QoiHeader): QoiHeader to populate
+        channels (int): Desired color channels (0 to use the file's channels)
+        executor (Optional[Executor]): Thread or process pool, see aencode
+
+    Returns:
+        bytes: Pixel data as bytearray, None on invalid input
+    """
+    loop = asyncio.get_running_loop()
+    pixels, header = await loop.run_in_executor(executor, _decode_with_header, data, size, channels)
+    if desc is not None:
+        _copy_header(header, desc)
+    return pixels
+
+async def aread(
+    filename: str, desc: QoiHeader, channels: int = 0, executor: Optional[Executor] = None
+) -> bytes:
+    """Reads and decodes a Qoi Image file in an executor
+
+    Args:
+        filename (str): Path to QOI file
+        desc (QoiHeader): QoiHeader to populate
+        channels (int): Desired color channels (0 to use file's channels)
+        executor (Optional[Executor]): Thread or process pool, see aencode
+
+    Returns:
+        bytes: Pixel data as bytes
+    """
+    loop = asyncio.get_running_loop()
+    pixels, header = await loop.run_in_executor(executor, _read_with_header, filename, channels)
+    if desc is not None:
+        _copy_header(header, desc)
+    return pixels
+
+async def awrite(
+    filename: str, data: bytes, desc: QoiHeader, out_len: int, executor: Optional[Executor] = None
+) -> None:
+    """Encodes and writes a Qoi Image file in an executor
+
+    Args:
+        filename (str): Output filename
+        data (bytes): Raw pixel data
+        desc (QoiHeader): Image header information
+        out_len (int): Length of pixel data
+        executor (Optional[Executor]): Thread or process pool, see aencode
+    """
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(executor, write, filename, data, desc, out_len)
+
+async def amap(
+    fn: Callable[[object], Awaitable],
+    jobs,
+    limit: int = 8,
+    return_exceptions: bool = False,
+) -> AsyncIterator[tuple]:
+    """Runs fn over a stream of jobs, at most limit at a time
+
+    The next job is only taken from jobs once a running one finishes, so
+    a slow or endless producer is paced by the consumers. Results are
+    yielded as they complete, so one large image does not hold back the
+    others.
+
+    Args:
+        fn (Callable): Coroutine function called with each job
+        jobs: Iterable or async iterable of jobs
+        limit (int): Most jobs running at once
+        return_exceptions (bool): Yield a failing job's exception as its
+            result instead of raising it
+
+    Returns:
+        AsyncIterator[tuple]: (job, result) pairs in completion order
+
+    Example:
+        async for path, pixels in amap(lambda p: aread(p, QoiHeader(0, 0, 0, 0)), paths):
+            ...
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+
+    async def run(job):
+        try:
+            return job, await fn(job)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            return job, e
+
+    source = _aiter(jobs)
+    pending = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < limit:
+                try:
+                    job = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(run(job)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,264 @@
+##### IMPORTS #######
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+import os
+
+from .pyqoi import QoiHeader, read, validate
+from .pool import QoiBufferPool
+
+### CONSTANTS ####
+QOI_EXTENSION = ".qoi"
+NPY_EXTENSION = ".npy"
+# Sources other than .npy files need Pillow
+IMAGE_EXTENSIONS = (NPY_EXTENSION, ".png", ".bmp", ".tif", ".tiff", ".jpg", ".jpeg")
+
+# Output buffers reused by every file a worker process encodes
+_POOL = QoiBufferPool(max_buffers=2)
+
+
+###  CLASSSES ####
+@dataclass
+class BatchResult:
+    """Outcome of one file in a batch
+
+    Attributes:
+        source (str): Input file
+        target (Optional[str]): Output file, None if the result was returned
+        desc (Optional[QoiHeader]): Header of the image, None on error
+        pixels (Optional[np.ndarray]): Decoded pixels, only when there is
+            no target; pixels written to disk never travel back to the parent
+        error (Optional[str]): Error message, None on success
+    """
+    source: str
+    target: Optional[str] = None
+    desc: Optional[QoiHeader] = None
+    pixels: Optional[np.ndarray] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+##### Util Functions ####
+def _load_image(path: str) -> np.ndarray:
+    """Loads a .npy array, or any image Pillow can open, as (h, w, c) uint8"""
+    if path.lower().endswith(NPY_EXTENSION):
+        return np.load(path)
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ValueError("Pillow is needed to read %s" % path)
+    with Image.open(path) as img:
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+        return np.asarray(img.convert("RGBA" if has_alpha else "RGB"))
+
+def _encode_file(source: str, target: str) -> BatchResult:
+    try:
+        arr = _load_image(source)
+        if arr.ndim != 3 or arr.shape[2] not in (3, 4) or arr.dtype != np.uint8:
+            return BatchResult(source, target, error="Unsupported image array")
+        height, width, channels = arr.shape
+        desc = QoiHeader(width, height, channels, 0)
+        with _POOL.encoded(arr, desc) as encoded:
+            if encoded is None:
+                return BatchResult(source, target, error="Unsupported image array")
+            with open(target, "wb") as f:
+                f.write(encoded)
+        return BatchResult(source, target, desc)
+    except Exception as e:
+        return BatchResult(source, target, error="%s: %s" % (type(e).__name__, e))
+
+def _decode_file(source: str, target: Optional[str], channels: int) -> BatchResult:
+    try:
+        desc = QoiHeader(0, 0, 0, 0)
+        if not os.path.isfile(source):
+            return BatchResult(source, target, error="File not found")
+        pixels = read(source, desc, channels)
+        if pixels is None:
+            return BatchResult(source, target, error="Invalid QOI data")
+        arr = np.frombuffer(pixels, dtype=np.uint8).reshape(
+            desc.height, desc.width, channels or desc.channels
+        )
+        if target is None:
+            return BatchResult(source, None, desc, arr)
+        np.save(target, arr)
+        return BatchResult(source, target, desc)
+    except Exception as e:
+        return BatchResult(source, target, error="%s: %s" % (type(e).__name__, e))
+
+def _validate_file(source: str) -> BatchResult:
+    try:
+        desc = QoiHeader(0, 0, 0, 0)
+        if not os.path.isfile(source):
+            return BatchResult(source, error="File not found")
+        if not validate(source, desc):
+            return BatchResult(source, desc=desc if desc.width else None, error="Invalid QOI data")
+        return BatchResult(source, desc=desc)
+    except Exception as e:
+        return BatchResult(source, error="%s: %s" % (type(e).__name__, e))
+
+def _run_chunk(fn, jobs: List[tuple]) -> List[BatchResult]:
+    return [fn(*job) for job in jobs]
+
+def _run(fn, jobs: Iterable[tuple], workers: Optional[int], chunksize: int, ordered: bool) -> Iterator[BatchResult]:
+    """Runs fn over jobs in a process pool, chunksize jobs per task"""
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    jobs = list(jobs)
+    chunks = [jobs[i : i + chunksize] for i in range(0, len(jobs), chunksize)]
+    if not chunks:
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_chunk, fn, chunk) for chunk in chunks]
+        for future in futures if ordered else as_completed(futures):
+            yield from future.result()
+
+
+##### IO #################
+def encode_many(
+    jobs: Iterable[Tuple[str, str]],
+    workers: Optional[int] = None,
+    chunksize: int = 1,
+    ordered: bool = True,
+) -> Iterator[BatchResult]:
+    """Encodes many images to QOI files across worker processes
+
+    Each worker loads its source, encodes it and writes the target itself,
+    so only a small BatchResult is sent back per file. A failing file is
+    reported in its result and does not stop the batch.
+
+    Args:
+        jobs (Iterable[Tuple[str, str]]): (source, target) paths; sources are
+            .npy arrays of shape (h, w, 3 or 4), or images Pillow can open
+        workers (Optional[int]): Worker processes (None for one per core)
+        chunksize (int): Files handed to a worker at a time
+        ordered (bool): Yield results in job order, else as they complete
+
+    Returns:
+        Iterator[BatchResult]: One result per job
+    """
+    return _run(_encode_file, jobs, workers, chunksize, ordered)
+
+def decode_many(
+    jobs: Iterable[Tuple[str, Optional[str]]],
+    channels: int = 0,
+    workers: Optional[int] = None,
+    chunksize: int = 1,
+    ordered: bool = True,
+) -> Iterator[BatchResult]:
+    """Decodes many QOI files across worker processes
+
+    With a target the worker saves the pixels as a .npy file and only the
+    header comes back; without one the pixels are returned in the result.
+
+    Args:
+        jobs (Iterable[Tuple[str, Optional[str]]]): (source, target) paths;
+            a target of None returns the pixels instead
+        channels (int): Desired color channels (0 to use each file's channels)
+        workers (Optional[int]): Worker processes (None for one per core)
+        chunksize (int): Files handed to a worker at a time
+        ordered (bool): Yield results in job order, else as they complete
+
+    Returns:
+        Iterator[BatchResult]: One result per job
+    """
+    if channels != 0 and channels != 3 and channels != 4:
+        raise ValueError("channels must be 0, 3 or 4")
+    return _run(
+        _decode_file,
+        ((source, target, channels) for source, target in jobs),
+        workers, chunksize, ordered,
+    )
+
+def convert_tree(
+    src_dir: str,
+    dst_dir: str,
+    workers: Optional[int] = None,
+    chunksize: int = 8,
+    ordered: bool = False,
+) -> Iterator[BatchResult]:
+    """Converts every image under src_dir, mirroring the tree into dst_dir
+
+    .qoi files are decoded to .npy arrays, and .npy arrays (or other images,
+    with Pillow) are encoded to .qoi files. Sources that would write the
+    same target, such as a.npy and a.png, are converted only once: the
+    first in scan order wins and the others are reported as failed.
+
+    Args:
+        src_dir (str): Directory to scan recursively
+        dst_dir (str): Directory receiving the converted files
+        workers (Optional[int]): Worker processes (None for one per core)
+        chunksize (int): Files handed to a worker at a time
+        ordered (bool): Yield the results of the encode jobs and then of the
+            decode jobs, each in scan order; else each group as they complete
+
+    Returns:
+        Iterator[BatchResult]: One result per source file, target collisions
+            first, then the encode jobs, then the decode jobs
+    """
+    encode_jobs, decode_jobs = [], []
+    claimed, collisions = {}, []
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        out_dir = os.path.join(dst_dir, os.path.relpath(root, src_dir))
+        for name in sorted(files):
+            stem, ext = os.path.splitext(name)
+            ext = ext.lower()
+            if ext == QOI_EXTENSION:
+                jobs, target = decode_jobs, os.path.join(out_dir, stem + NPY_EXTENSION)
+            elif ext in IMAGE_EXTENSIONS:
+                jobs, target = encode_jobs, os.path.join(out_dir, stem + QOI_EXTENSION)
+            else:
+                continue
+            source = os.path.join(root, name)
+            key = os.path.normcase(target)
+            if key in claimed:
+                collisions.append(BatchResult(source, target, error="%s is already written from %s" % (target, claimed[key])))
+                continue
+            claimed[key] = source
+            os.makedirs(out_dir, exist_ok=True)
+            jobs.append((source, target))
+
+    yield from collisions
+    yield from encode_many(encode_jobs, workers, chunksize, ordered)
+    yield from decode_many(decode_jobs, 0, workers, chunksize, ordered)
+
+def validate_many(
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+    ordered: bool = True,
+) -> Iterator[BatchResult]:
+    """Validates many QOI files across worker processes without decoding them
+
+    Args:
+        paths (Iterable[str]): QOI files
+        workers (Optional[int]): Worker processes (None for one per core)
+        chunksize (int): Files handed to a worker at a time
+        ordered (bool): Yield results in path order, else as they complete
+
+    Returns:
+        Iterator[BatchResult]: One result per file, with the header in desc
+            and error set if the file is malformed
+    """
+    return _run(_validate_file, ((path,) for path in paths), workers, chunksize, ordered)
+
+def scan_tree(
+    src_dir: str,
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+    ordered: bool = False,
+) -> Iterator[BatchResult]:
+    """Validates every .qoi file under src_dir, see validate_many"""
+    paths = []
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        paths.extend(
+            os.path.join(root, name) for name in sorted(files)
+            if name.lower().endswith(QOI_EXTENSION)
+        )
+    return validate_many(paths, workers, chunksize, ordered)
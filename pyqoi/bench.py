@@ -0,0 +1,259 @@
+"""Benchmarks for pyqoi on deterministic synthetic images
+
+Usage:
+    python -m pyqoi.bench --sizes small,medium --output results.json
+    python -m pyqoi.bench --baseline results.json --tolerance 0.2
+
+Each corpus image is encoded and decoded by every codec; the best of
+--repeat runs gives the throughput in megapixels per second, a separate
+run under tracemalloc gives the peak memory. With --baseline the results
+are compared against a stored JSON file and the exit status is 1 if any
+throughput or peak memory got worse by more than --tolerance.
+"""
+##### IMPORTS #######
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from .pyqoi import QoiHeader, QOI_SRGB, encode, decode
+from .vectorized import encode_vectorized, decode_vectorized
+
+### CONSTANTS ####
+SIZES: Dict[str, Tuple[int, int]] = {
+    "tiny": (64, 64),
+    "small": (256, 256),
+    "medium": (1024, 1024),
+    "large": (4096, 4096),
+    "huge": (8192, 4096),
+}
+
+# Encoder and decoder of each codec
+CODECS: Dict[str, Tuple[Callable, Callable]] = {
+    "scalar": (encode, decode),
+    "vectorized": (encode_vectorized, decode_vectorized),
+}
+
+
+##### Corpora ####
+def _noise(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+def _gradient(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    x = np.linspace(0, 255, width)[None, :]
+    y = np.linspace(0, 255, height)[:, None]
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[..., 0] = x
+    img[..., 1] = y
+    img[..., 2] = (x + y) / 2
+    return img
+
+def _flat_ui(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    palette = rng.integers(0, 256, (8, 3), dtype=np.uint8)
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[:] = palette[0]
+    # Panels of flat colour
+    for _ in range(max(4, width * height // 20000)):
+        x0, y0 = rng.integers(0, width), rng.integers(0, height)
+        w, h = rng.integers(8, max(9, width // 4)), rng.integers(8, max(9, height // 4))
+        img[y0 : y0 + h, x0 : x0 + w] = palette[rng.integers(1, len(palette))]
+    return img
+
+def _screenshot(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    img = _flat_ui(rng, width, height)
+    # Lines of "text": short dark glyph-like strokes on every 16th row band
+    glyphs = rng.random((height, width)) < 0.25
+    lines = (np.arange(height) % 16 < 9)[:, None]
+    columns = (np.arange(width) % 400 < 320)[None, :]
+    img[glyphs & lines & columns] = (20, 20, 30)
+    return img
+
+def _rgba_alpha(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    img = np.empty((height, width, 4), dtype=np.uint8)
+    img[..., :3] = _gradient(rng, width, height)
+    # Radial alpha falloff, fully transparent in the corners
+    x = np.linspace(-1, 1, width)[None, :]
+    y = np.linspace(-1, 1, height)[:, None]
+    img[..., 3] = np.clip(255 * (1.2 - np.hypot(x, y)), 0, 255)
+    return img
+
+CORPORA: Dict[str, Callable[[np.random.Generator, int, int], np.ndarray]] = {
+    "noise": _noise,
+    "gradient": _gradient,
+    "flat_ui": _flat_ui,
+    "screenshot": _screenshot,
+    "rgba_alpha": _rgba_alpha,
+}
+
+def make_corpus(name: str, width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Generates a synthetic (height, width, channels) image
+
+    Args:
+        name (str): One of CORPORA
+        width (int): Image width
+        height (int): Image height
+        seed (int): Random seed; the same arguments always give the same image
+
+    Returns:
+        np.ndarray: uint8 image array
+    """
+    return CORPORA[name](np.random.default_rng(seed), width, height)
+
+
+##### Measurement ####
+def _best_time(fn: Callable, args: tuple, repeat: int) -> Tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def _peak_memory(fn: Callable, args: tuple) -> int:
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run_benchmarks(
+    corpora: List[str], sizes: List[str], codecs: List[str], repeat: int = 3, memory: bool = True
+) -> List[dict]:
+    """Benchmarks every codec on every corpus at every size
+
+    Args:
+        corpora (List[str]): Names from CORPORA
+        sizes (List[str]): Names from SIZES, or "WIDTHxHEIGHT"
+        codecs (List[str]): Names from CODECS
+        repeat (int): Timed runs per measurement, the best is kept
+        memory (bool): Also measure peak memory with tracemalloc
+
+    Returns:
+        List[dict]: One record per corpus, size, codec and operation
+    """
+    results = []
+    for size in sizes:
+        width, height = parse_size(size)
+        for corpus in corpora:
+            img = make_corpus(corpus, width, height)
+            channels = img.shape[2]
+            raw = img.tobytes()
+            desc = QoiHeader(width, height, channels, QOI_SRGB)
+            megapixels = width * height / 1e6
+
+            for codec in codecs:
+                encoder, decoder = CODECS[codec]
+                enc_args = (raw, desc, len(raw))
+                seconds, (encoded, encoded_len) = _best_time(encoder, enc_args, repeat)
+                dec_args = (encoded, encoded_len, QoiHeader(0, 0, 0, 0))
+                dec_seconds, decoded = _best_time(decoder, dec_args, repeat)
+                if bytes(decoded) != raw:
+                    raise AssertionError("%s round trip failed on %s %s" % (codec, corpus, size))
+
+                for op, fn, args, t in (
+                    ("encode", encoder, enc_args, seconds),
+                    ("decode", decoder, dec_args, dec_seconds),
+                ):
+                    results.append({
+                        "corpus": corpus,
+                        "size": size,
+                        "width": width,
+                        "height": height,
+                        "channels": channels,
+                        "codec": codec,
+                        "op": op,
+                        "seconds": t,
+                        "mpps": megapixels / t if t else float("inf"),
+                        "peak_bytes": _peak_memory(fn, args) if memory else None,
+                        "ratio": encoded_len / len(raw),
+                    })
+    return results
+
+def parse_size(size: str) -> Tuple[int, int]:
+    """Turns a SIZES name or "WIDTHxHEIGHT" into (width, height)"""
+    if size in SIZES:
+        return SIZES[size]
+    width, _, height = size.lower().partition("x")
+    return int(width), int(height)
+
+def _key(record: dict) -> Tuple[str, str, str, str]:
+    return record["corpus"], record["size"], record["codec"], record["op"]
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float = 0.15) -> List[str]:
+    """Lists the regressions of results against a baseline
+
+    Throughput below baseline * (1 - tolerance), peak memory above
+    baseline * (1 + tolerance) and any change in compression ratio count
+    as regressions. Records missing from either side are skipped.
+
+    Returns:
+        List[str]: One message per regression, empty if there are none
+    """
+    previous = {_key(record): record for record in baseline}
+    problems = []
+    for record in results:
+        old = previous.get(_key(record))
+        if old is None:
+            continue
+        name = "/".join(_key(record))
+        if record["mpps"] < old["mpps"] * (1 - tolerance):
+            problems.append("%s: %.2f MP/s, baseline %.2f MP/s" % (name, record["mpps"], old["mpps"]))
+        if record["peak_bytes"] and old["peak_bytes"] and record["peak_bytes"] > old["peak_bytes"] * (1 + tolerance):
+            problems.append("%s: peak %d bytes, baseline %d bytes" % (name, record["peak_bytes"], old["peak_bytes"]))
+        if abs(record["ratio"] - old["ratio"]) > 1e-9:
+            problems.append("%s: ratio %.4f, baseline %.4f" % (name, record["ratio"], old["ratio"]))
+    return problems
+
+
+##### CLI ####
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m pyqoi.bench", description=__doc__.splitlines()[0])
+    parser.add_argument("--corpora", default=",".join(CORPORA), help="comma separated corpus names")
+    parser.add_argument("--sizes", default="small", help="comma separated: %s or WIDTHxHEIGHT" % ", ".join(SIZES))
+    parser.add_argument("--codecs", default=",".join(CODECS), help="comma separated codec names")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc peak memory runs")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.corpora.split(","), args.sizes.split(","), args.codecs.split(","),
+        args.repeat, not args.no_memory,
+    )
+
+    print("%-12s %-10s %-10s %-6s %10s %12s %7s" % ("corpus", "size", "codec", "op", "MP/s", "peak MiB", "ratio"))
+    for r in results:
+        peak = "%.1f" % (r["peak_bytes"] / 2 ** 20) if r["peak_bytes"] is not None else "-"
+        print("%-12s %-10s %-10s %-6s %10.2f %12s %7.3f" % (
+            r["corpus"], r["size"], r["codec"], r["op"], r["mpps"], peak, r["ratio"],
+        ))
+
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f)["results"], args.tolerance)
+        for problem in problems:
+            print("REGRESSION " + problem, file=sys.stderr)
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+##### IMPORTS #######
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+import hashlib
+import os
+import threading
+
+from .pyqoi import QoiHeader, decode, read, _as_byte_view
+
+
+###  CLASSSES ####
+class QoiCache:
+    """Thread-safe LRU cache of decoded images, bounded by decoded bytes
+
+    Files are keyed by path, mtime and size, so a rewritten file is decoded
+    again; in-memory data is keyed by a hash of its bytes. Hits return a
+    read-only memoryview of the cached pixels, shared by every caller.
+    Images are decoded outside the lock, so threads missing on the same
+    image at once may each decode it.
+
+    Args:
+        max_bytes (int): Most decoded bytes held; least recently used
+            images are evicted beyond it, larger images are not cached
+
+    Example:
+        cache = QoiCache(max_bytes=512 * 2 ** 20)
+        pixels = cache.read("tiles/0/0.qoi", QoiHeader(0, 0, 0, 0))
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2 ** 20):
+        if max_bytes < 0:
+            raise ValueError("max_bytes must not be negative")
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[bytearray, QoiHeader]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def read(self, filename: str, desc: QoiHeader, channels: int = 0) -> Optional[memoryview]:
+        """Cached read
+
+        Args:
+            filename (str): Path to QOI file
+            desc (QoiHeader): QoiHeader to populate
+            channels (int): Desired color channels (0 to use file's channels)
+
+        Returns:
+            memoryview: Read-only pixel data, None on invalid input
+        """
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        key = ("file", os.path.realpath(filename), st.st_mtime_ns, st.st_size, channels)
+        return self._get(key, desc, lambda d: read(filename, d, channels))
+
+    def decode(self, data: bytes, size: int, desc: QoiHeader, channels: int = 0) -> Optional[memoryview]:
+        """Cached decode, keyed by a hash of data[:size]
+
+        Args:
+            data (bytes): QOI encoded data; any buffer-protocol object
+            size (int): Size of the encoded data
+            desc (QoiHeader): QoiHeader to populate
+            channels (int): Desired color channels (0 to use the file's channels)
+
+        Returns:
+            memoryview: Read-only pixel data, None on invalid input
+        """
+        if data is None:
+            return None
+        bytes_data = _as_byte_view(data)[:size]
+        key = ("data", hashlib.blake2b(bytes_data, digest_size=16).digest(), size, channels)
+        return self._get(key, desc, lambda d: decode(bytes_data, size, d, channels))
+
+    def clear(self) -> None:
+        """Drops every cached image; the counters are kept"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _get(self, key: Hashable, desc: QoiHeader, load) -> Optional[memoryview]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is None:
+            header = QoiHeader(0, 0, 0, 0)
+            pixels = load(header)
+            if pixels is None:
+                return None
+            entry = (pixels, header)
+            self._put(key, entry)
+
+        pixels, header = entry
+        if desc is not None:
+            desc.width, desc.height = header.width, header.height
+            desc.channels, desc.colorspace = header.channels, header.colorspace
+        return memoryview(pixels).toreadonly()
+
+    def _put(self, key: Hashable, entry: Tuple[bytearray, QoiHeader]) -> None:
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (old, _) = self._entries.popitem(last=False)
+                self.nbytes -= len(old)
+                self.evictions += 1
@@ -0,0 +1,123 @@
+##### IMPORTS #######
+from typing import Optional, Tuple
+import os
+
+from .pyqoi import QoiHeader, decode, read, read_header, _as_byte_view
+
+
+###  CLASSSES ####
+class QoiImage:
+    """A Qoi Image whose pixels are decoded on first access
+
+    The header is read when the image is created; the pixels only when
+    pixels, the buffer protocol or __array_interface__ first asks for
+    them. np.asarray(image), Image.fromarray(image) and, on Python 3.12+,
+    memoryview(image) all share the decoded buffer without copying.
+
+    Args:
+        source: Path to a QOI file, or QOI encoded data in any buffer.
+            The buffer object is kept, but only viewed while decoding, so
+            e.g. an mmap may be closed once the pixels are decoded; after
+            that, pixels cannot be decoded again following release()
+        channels (int): Desired color channels (0 to use the file's channels)
+
+    Example:
+        image = QoiImage("image.qoi")
+        print(image.width, image.height)  # Reads 14 bytes only
+        arr = np.asarray(image)           # Decodes now
+    """
+
+    def __init__(self, source, channels: int = 0):
+        if channels not in (0, 3, 4):
+            raise ValueError("channels must be 0, 3 or 4")
+        header = read_header(source)
+        if header is None:
+            raise ValueError("Invalid QOI image")
+
+        self.header = header
+        self.channels = channels or header.channels
+        self._source = source
+        self._pixels: Optional[bytearray] = None
+
+    @property
+    def width(self) -> int:
+        return self.header.width
+
+    @property
+    def height(self) -> int:
+        return self.header.height
+
+    @property
+    def colorspace(self) -> int:
+        return self.header.colorspace
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        """(height, width, channels) of the decoded pixels"""
+        return self.header.height, self.header.width, self.channels
+
+    @property
+    def nbytes(self) -> int:
+        return self.header.width * self.header.height * self.channels
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the pixels are currently decoded"""
+        return self._pixels is not None
+
+    @property
+    def pixels(self) -> bytearray:
+        """The decoded pixels, decoding them on first access"""
+        if self._pixels is None:
+            desc = QoiHeader(0, 0, 0, 0)
+            if isinstance(self._source, (str, os.PathLike)):
+                pixels = read(self._source, desc, self.channels)
+            else:
+                pixels = self._decode_source(desc)
+            if pixels is None or desc != self.header:
+                raise ValueError("Invalid QOI image")
+            self._pixels = pixels
+        return self._pixels
+
+    def _decode_source(self, desc: QoiHeader) -> Optional[bytearray]:
+        """Decodes the buffer source, holding a view of it only meanwhile"""
+        try:
+            view = _as_byte_view(self._source)
+        except ValueError:
+            # A closed mmap
+            return None
+        try:
+            return decode(view, len(view), desc, self.channels)
+        finally:
+            if isinstance(view, memoryview):
+                view.release()
+
+    def release(self) -> None:
+        """Drops the decoded pixels, keeping the header
+
+        Arrays and memoryviews already taken keep the old buffer alive; the
+        next access decodes again.
+        """
+        self._pixels = None
+
+    @property
+    def __array_interface__(self) -> dict:
+        return {
+            "shape": self.shape,
+            "typestr": "|u1",
+            # Handing over the bytearray itself keeps it alive for as long
+            # as the array, even after release()
+            "data": self.pixels,
+            "version": 3,
+        }
+
+    def __buffer__(self, flags: int) -> memoryview:
+        return memoryview(self.pixels)
+
+    def __release_buffer__(self, view: memoryview) -> None:
+        view.release()
+
+    def __repr__(self) -> str:
+        return "QoiImage(width=%d, height=%d, channels=%d, colorspace=%d, loaded=%s)" % (
+            self.width, self.height, self.channels, self.colorspace, self.loaded,
+        )
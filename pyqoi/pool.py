@@ -0,0 +1,114 @@
+##### IMPORTS #######
+from contextlib import contextmanager
+from typing import Iterator, List
+import threading
+
+from .pyqoi import (
+    QoiHeader,
+    QOI_HEADER_SIZE,
+    qoi_padding,
+    decode,
+    encode_into,
+    max_encoded_size,
+    _as_byte_view,
+    _read_header,
+)
+
+
+###  CLASSSES ####
+class QoiBufferPool:
+    """Thread-safe pool of reusable bytearrays for encode and decode output
+
+    Buffers are never shrunk or freed while pooled, so a batch of similar
+    images settles on a few allocations. Results are handed out as
+    memoryviews of pooled buffers, valid until the buffer goes back.
+
+    Args:
+        max_buffers (int): Most idle buffers kept; extra ones are dropped
+
+    Example:
+        pool = QoiBufferPool()
+        for data, desc, path in images:
+            with pool.encoded(data, desc) as view, open(path, "wb") as f:
+                f.write(view)
+    """
+
+    def __init__(self, max_buffers: int = 8):
+        self.max_buffers = max_buffers
+        self._idle: List[bytearray] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, size: int) -> bytearray:
+        """Takes the smallest idle buffer of at least size bytes, or a new one"""
+        with self._lock:
+            fits = [buf for buf in self._idle if len(buf) >= size]
+            if fits:
+                buffer = min(fits, key=len)
+                self._idle.remove(buffer)
+                return buffer
+        return bytearray(size)
+
+    def release(self, buffer: bytearray) -> None:
+        """Returns a buffer from acquire to the pool"""
+        with self._lock:
+            if len(self._idle) < self.max_buffers:
+                self._idle.append(buffer)
+
+    @contextmanager
+    def _lend(self, buffer: bytearray, length: int) -> Iterator[memoryview]:
+        """Yields buffer[:length] as a memoryview, None if length is 0"""
+        if not length:
+            self.release(buffer)
+            yield None
+            return
+        view = memoryview(buffer)[:length]
+        try:
+            yield view
+        finally:
+            try:
+                view.release()
+            except BufferError:
+                # Something still holds an export of the view; leave the
+                # buffer to it instead of reusing it
+                return
+            self.release(buffer)
+
+    @contextmanager
+    def encoded(self, data: bytes, desc: QoiHeader) -> Iterator[memoryview]:
+        """Encodes into a pooled buffer
+
+        Yields:
+            memoryview: The encoded image, None on invalid input; released
+                and its buffer returned to the pool on exit
+        """
+        size = max_encoded_size(desc)
+        if size is None:
+            yield None
+            return
+        buffer = self.acquire(size)
+        length = encode_into(data, desc, buffer)
+        with self._lend(buffer, length) as view:
+            yield view
+
+    @contextmanager
+    def decoded(self, data: bytes, size: int, desc: QoiHeader, channels: int = 0) -> Iterator[memoryview]:
+        """Decodes into a pooled buffer
+
+        Yields:
+            memoryview: The pixels, None on invalid input; released and its
+                buffer returned to the pool on exit
+        """
+        bytes_data = _as_byte_view(data) if data is not None else None
+        if (
+            bytes_data is None
+            or desc is None
+            or size < QOI_HEADER_SIZE + len(qoi_padding)
+            or not _read_header(bytes_data, desc)
+        ):
+            yield None
+            return
+        px_len = desc.width * desc.height * (channels or desc.channels)
+        buffer = self.acquire(px_len)
+        pixels = decode(bytes_data, size, desc, channels, buffer)
+        with self._lend(buffer, px_len if pixels is not None else 0) as view:
+            yield view
@@ -1,8 +1,10 @@
 ##### IMPORTS #######
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from io import BytesIO
+from itertools import repeat
 from typing import List, ByteString, Optional, Tuple
 import numpy as np
+import mmap
 import os, sys
 
 ### CONSTANTS ####
@@ -26,6 +28,32 @@ QOI_PIXELS_MAX = 400000000
 
 qoi_padding = [0 for _ in range(7)] + [1]
 
+# Decoder dispatch tables, indexed by the first byte of a chunk
+QOI_OP_KIND = (
+    [QOI_OP_INDEX] * 64 + [QOI_OP_DIFF] * 64 + [QOI_OP_LUMA] * 64 + [QOI_OP_RUN] * 62
+    + [QOI_OP_RGB, QOI_OP_RGBA]
+)
+QOI_DIFF_DR = [((b1 >> 4) & 0x03) - 2 for b1 in range(256)]
+QOI_DIFF_DG = [((b1 >> 2) & 0x03) - 2 for b1 in range(256)]
+QOI_DIFF_DB = [(b1 & 0x03) - 2 for b1 in range(256)]
+QOI_LUMA_VG = [(b1 & 0x3F) - 32 for b1 in range(256)]
+# ... and by the second byte of a QOI_OP_LUMA chunk
+QOI_LUMA_VG_R = [((b2 >> 4) & 0x0F) - 8 for b2 in range(256)]
+QOI_LUMA_VG_B = [(b2 & 0x0F) - 8 for b2 in range(256)]
+# Byte offset of red, green, blue and alpha within a pixel, by channel order
+QOI_CHANNEL_ORDERS = {
+    "RGB": (0, 1, 2, None),
+    "BGR": (2, 1, 0, None),
+    "RGBA": (0, 1, 2, 3),
+    "BGRA": (2, 1, 0, 3),
+    "ARGB": (1, 2, 3, 0),
+}
+# Bytes taken by a chunk, and pixels it covers, by its first byte
+QOI_CHUNK_SIZE = [2 if 0x80 <= b1 < 0xC0 else 1 for b1 in range(256)]
+QOI_CHUNK_SIZE[QOI_OP_RGB] = 4
+QOI_CHUNK_SIZE[QOI_OP_RGBA] = 5
+QOI_CHUNK_SPAN = [(b1 & 0x3F) + 1 if 0xC0 <= b1 < 0xFE else 1 for b1 in range(256)]
+
 
 ###  CLASSSES ####
 @dataclass
@@ -50,6 +78,38 @@ class QoiRGBA:
     v: np.uint = None
 
 
+@dataclass
+class _EncoderState:
+    """Encoder state carried from one batch of pixels to the next
+
+    Pixels are packed as 0xRRGGBBAA ints and the index is a flat list of
+    those ints. Empty index slots and the initial previous pixel hold -1,
+    which no packed pixel can equal.
+    """
+    index: List[int] = field(default_factory=lambda: [-1] * 64)
+    run: int = 0
+    px_prev: int = -1
+    r: int = 0
+    g: int = 0
+    b: int = 0
+    a: int = 255
+
+
+@dataclass
+class _DecoderState:
+    """Decoder state carried from one span of chunks to the next
+
+    The index holds packed 0xRRGGBBAA ints, starting as transparent black.
+    run counts the pixels of a run chunk not yet written out.
+    """
+    index: List[int] = field(default_factory=lambda: [0] * 64)
+    run: int = 0
+    r: int = 0
+    g: int = 0
+    b: int = 0
+    a: int = 255
+
+
 ##### Util Functions ####
 def qoiWrite32(bytes: bytearray, p: int, v: np.uint):
     bytes[p] = (0xFF000000 & v) >> 24
@@ -75,15 +135,416 @@ def qoiRead32(bytes: List[int], p: int) -> Tuple[np.uint, int]:
     return (a << 24 | b << 16 | c << 8 | d, p)
 
 
+def _as_byte_view(data):
+    """Returns a flat view of raw pixel or QOI data without copying it.
+
+    Buffer-protocol objects (bytes, bytearray, numpy arrays, ...) are viewed
+    as a 1-D memoryview of unsigned bytes; plain sequences of ints are
+    returned as they are.
+    """
+    try:
+        view = memoryview(data)
+    except TypeError:
+        return data
+    if not view.c_contiguous:
+        return view.tobytes()
+    if view.ndim != 1 or view.format != "B":
+        view = view.cast("B")
+    return view
+
+
+def _is_opaque(data, desc: QoiHeader, offsets) -> bool:
+    """True if every alpha of 4-channel data is 255, checked on a view"""
+    if _is_strided(data):
+        alpha = data[: desc.height].reshape(desc.height, desc.width, 4)[..., offsets[3]]
+    else:
+        view = _as_byte_view(data)
+        px_len = desc.width * desc.height * 4
+        if isinstance(view, memoryview):
+            alpha = np.frombuffer(view, dtype=np.uint8, count=px_len)[offsets[3] :: 4]
+        else:
+            alpha = np.asarray(view[:px_len], dtype=np.uint8)[offsets[3] :: 4]
+    return bool(alpha.size) and alpha.min() == 255
+
+def _channel_offsets(order: Optional[str], channels: int):
+    """Channel offsets of order, None unless it has channels letters"""
+    if order is None:
+        order = "RGBA" if channels == 4 else "RGB"
+    if len(order) != channels:
+        return None
+    return QOI_CHANNEL_ORDERS.get(order)
+
+def _is_strided(data) -> bool:
+    """True for NumPy views, such as crops, that are not one contiguous block"""
+    return isinstance(data, np.ndarray) and data.ndim > 1 and not data.flags.c_contiguous
+
+def _pixels_fit(data, desc: QoiHeader) -> bool:
+    """True if data holds at least the image's pixels"""
+    row_len = desc.width * desc.channels
+    if _is_strided(data):
+        return len(data) >= desc.height and data[0].size == row_len
+    return len(_as_byte_view(data)) >= row_len * desc.height
+
+def _write_header(encoded: bytearray, p: int, desc: QoiHeader) -> int:
+    """Writes the 14 byte QOI header at p and returns the new end"""
+    encoded, p = qoiWrite32(encoded, p, QOI_MAGIC)
+    encoded, p = qoiWrite32(encoded, p, desc.width)
+    encoded, p = qoiWrite32(encoded, p, desc.height)
+
+    encoded[p] = desc.channels
+    p += 1
+    encoded[p] = desc.colorspace
+    p += 1
+    return p
+
+
+def _encode_pixels(
+    pixels, channels: int, encoded: bytearray, p: int, state: _EncoderState,
+    offsets: Tuple[int, int, int, Optional[int]] = None,
+) -> int:
+    """Encodes whole pixels into encoded at p and returns the new end
+
+    A run still open after the last pixel is left pending in state, so the
+    next batch can continue it; _encode_finish flushes it at the end.
+    Each pixel takes at most channels + 1 bytes, plus one byte for a
+    pending run flushed before the first pixel. offsets, from
+    QOI_CHANNEL_ORDERS, locates each channel within a pixel.
+    """
+    index = state.index
+    run = state.run
+    px_prev = state.px_prev
+    pr, pg, pb, pa = state.r, state.g, state.b, state.a
+
+    ro, go, bo, ao = offsets or (0, 1, 2, 3 if channels == 4 else None)
+    if ao is not None:
+        alphas = pixels[ao::channels]
+    else:
+        alphas = repeat(255, len(pixels) // channels)
+
+    for r, g, b, a in zip(
+        pixels[ro::channels],
+        pixels[go::channels],
+        pixels[bo::channels],
+        alphas,
+    ):
+        v = r << 24 | g << 16 | b << 8 | a
+
+        if v == px_prev:
+            run += 1
+            if run == 62:
+                encoded[p] = QOI_OP_RUN | 61
+                p += 1
+                run = 0
+            continue
+
+        if run > 0:
+            encoded[p] = QOI_OP_RUN | (run - 1)
+            p += 1
+            run = 0
+
+        index_pos = (r * 3 + g * 5 + b * 7 + a * 11) & 63
+
+        if index[index_pos] == v:
+            encoded[p] = QOI_OP_INDEX | index_pos
+            p += 1
+        else:
+            index[index_pos] = v
+            if a == pa:
+                vr = r - pr
+                vg = g - pg
+                vb = b - pb
+
+                vg_r = vr - vg
+                vg_b = vb - vg
+
+                if -2 <= vr < 2 and -2 <= vg < 2 and -2 <= vb < 2:
+                    encoded[p] = (
+                        QOI_OP_DIFF | ((vr + 2) << 4) | ((vg + 2) << 2) | (vb + 2)
+                    )
+                    p += 1
+                elif -8 <= vg_r <= 7 and -32 <= vg <= 31 and -8 <= vg_b <= 7:
+                    encoded[p] = QOI_OP_LUMA | (vg + 32)
+                    encoded[p + 1] = ((vg_r + 8) << 4) | (vg_b + 8)
+                    p += 2
+                else:
+                    encoded[p] = QOI_OP_RGB
+                    encoded[p + 1] = r
+                    encoded[p + 2] = g
+                    encoded[p + 3] = b
+                    p += 4
+            else:
+                encoded[p] = QOI_OP_RGBA
+                encoded[p + 1] = r
+                encoded[p + 2] = g
+                encoded[p + 3] = b
+                encoded[p + 4] = a
+                p += 5
+
+        px_prev = v
+        pr, pg, pb, pa = r, g, b, a
+
+    state.run = run
+    state.px_prev = px_prev
+    state.r, state.g, state.b, state.a = pr, pg, pb, pa
+    return p
+
+
+def _encode_finish(encoded: bytearray, p: int, state: _EncoderState) -> int:
+    """Flushes the pending run and writes the end marker, returning the new end"""
+    if state.run > 0:
+        encoded[p] = QOI_OP_RUN | (state.run - 1)
+        p += 1
+        state.run = 0
+
+    for i in range(len(qoi_padding)):
+        encoded[p] = qoi_padding[i]
+        p += 1
+    return p
+
+
+def _read_header(bytes_data, desc: QoiHeader) -> bool:
+    """Populates desc from the 14 byte QOI header, False if it is invalid"""
+    p = 0
+    header_magic, p = qoiRead32(bytes_data, p)
+    desc.width, p = qoiRead32(bytes_data, p)
+    desc.height, p = qoiRead32(bytes_data, p)
+    desc.channels = bytes_data[p]
+    p += 1
+    desc.colorspace = bytes_data[p]
+
+    return not (
+        desc.width == 0
+        or desc.height == 0
+        or desc.channels < 3
+        or desc.channels > 4
+        or desc.colorspace > 1
+        or header_magic != QOI_MAGIC
+        or desc.height >= QOI_PIXELS_MAX / desc.width
+    )
+
+def _decode_pixels(
+    bytes_data, p: int, chunks_len: int, pixels, px_pos: int, px_end: int,
+    channels: int, state: _DecoderState
+) -> Tuple[int, int]:
+    """Decodes chunks from p into pixels[px_pos:px_end]
+
+    Stops once px_end is reached or no chunk starts before chunks_len,
+    and returns the new p and px_pos. Chunks are dispatched through
+    256-entry tables keyed by their first byte, and runs are written with
+    a single slice assignment; a run crossing px_end is left pending in
+    state for the next call.
+    """
+    index = state.index
+    r, g, b, a = state.r, state.g, state.b, state.a
+
+    kinds = QOI_OP_KIND
+    diff_r, diff_g, diff_b = QOI_DIFF_DR, QOI_DIFF_DG, QOI_DIFF_DB
+    luma_vg, luma_r, luma_b = QOI_LUMA_VG, QOI_LUMA_VG_R, QOI_LUMA_VG_B
+
+    if state.run:
+        run = min(state.run, (px_end - px_pos) // channels)
+        pixels[px_pos : px_pos + run * channels] = bytes((r, g, b, a)[:channels]) * run
+        px_pos += run * channels
+        state.run -= run
+
+    while px_pos < px_end and p < chunks_len:
+        b1 = bytes_data[p]
+        p += 1
+        op = kinds[b1]
+
+        if op == QOI_OP_DIFF:
+            r = (r + diff_r[b1]) & 0xFF
+            g = (g + diff_g[b1]) & 0xFF
+            b = (b + diff_b[b1]) & 0xFF
+        elif op == QOI_OP_INDEX:
+            v = index[b1]
+            r = v >> 24
+            g = (v >> 16) & 0xFF
+            b = (v >> 8) & 0xFF
+            a = v & 0xFF
+        elif op == QOI_OP_LUMA:
+            b2 = bytes_data[p]
+            p += 1
+            vg = luma_vg[b1]
+            r = (r + vg + luma_r[b2]) & 0xFF
+            g = (g + vg) & 0xFF
+            b = (b + vg + luma_b[b2]) & 0xFF
+        elif op == QOI_OP_RUN:
+            # Fill the whole run with one slice assignment
+            index[(r * 3 + g * 5 + b * 7 + a * 11) & 63] = r << 24 | g << 16 | b << 8 | a
+            run = (b1 & 0x3F) + 1
+            room = (px_end - px_pos) // channels
+            if run > room:
+                state.run = run - room
+                run = room
+            pixels[px_pos : px_pos + run * channels] = bytes((r, g, b, a)[:channels]) * run
+            px_pos += run * channels
+            continue
+        elif op == QOI_OP_RGB:
+            r = bytes_data[p]
+            g = bytes_data[p + 1]
+            b = bytes_data[p + 2]
+            p += 3
+        else:
+            r = bytes_data[p]
+            g = bytes_data[p + 1]
+            b = bytes_data[p + 2]
+            a = bytes_data[p + 3]
+            p += 4
+
+        index[(r * 3 + g * 5 + b * 7 + a * 11) & 63] = r << 24 | g << 16 | b << 8 | a
+
+        pixels[px_pos] = r
+        pixels[px_pos + 1] = g
+        pixels[px_pos + 2] = b
+        if channels == 4:
+            pixels[px_pos + 3] = a
+            px_pos += 4
+        else:
+            px_pos += 3
+
+    state.r, state.g, state.b, state.a = r, g, b, a
+    return p, px_pos
+
+def _reorder_channels(pixels, px_len: int, channels: int, offsets) -> None:
+    """Rearranges RGB/RGBA pixels in place into the layout of offsets"""
+    view = np.frombuffer(pixels, dtype=np.uint8, count=px_len).reshape(-1, channels)
+    source = [0] * channels
+    for channel, offset in enumerate(offsets[:channels]):
+        source[offset] = channel
+    # Blocks of rows keep the temporary copy small
+    for start in range(0, len(view), 65536):
+        block = view[start : start + 65536]
+        block[:] = block[:, source]
+
+def _fill_last_pixel(pixels, px_pos: int, px_end: int, channels: int, state: _DecoderState) -> None:
+    """Repeats the last decoded pixel over pixels[px_pos:px_end]"""
+    pixel = bytes((state.r, state.g, state.b, state.a)[:channels])
+    pixels[px_pos:px_end] = pixel * ((px_end - px_pos) // channels)
+
+def _skip_pixels(
+    bytes_data, p: int, chunks_len: int, count: int, state: _DecoderState
+) -> Tuple[int, int]:
+    """Walks chunks from p over count pixels, updating state without writing them
+
+    Mirrors _decode_pixels, including a run crossing the end being left
+    pending in state. Returns the new p and the pixels skipped, fewer than
+    count only when the chunks run out.
+    """
+    index = state.index
+    r, g, b, a = state.r, state.g, state.b, state.a
+
+    kinds = QOI_OP_KIND
+    diff_r, diff_g, diff_b = QOI_DIFF_DR, QOI_DIFF_DG, QOI_DIFF_DB
+    luma_vg, luma_r, luma_b = QOI_LUMA_VG, QOI_LUMA_VG_R, QOI_LUMA_VG_B
+
+    skipped = min(state.run, count)
+    state.run -= skipped
+
+    while skipped < count and p < chunks_len:
+        b1 = bytes_data[p]
+        p += 1
+        op = kinds[b1]
+
+        if op == QOI_OP_DIFF:
+            r = (r + diff_r[b1]) & 0xFF
+            g = (g + diff_g[b1]) & 0xFF
+            b = (b + diff_b[b1]) & 0xFF
+        elif op == QOI_OP_INDEX:
+            v = index[b1]
+            r = v >> 24
+            g = (v >> 16) & 0xFF
+            b = (v >> 8) & 0xFF
+            a = v & 0xFF
+        elif op == QOI_OP_LUMA:
+            b2 = bytes_data[p]
+            p += 1
+            vg = luma_vg[b1]
+            r = (r + vg + luma_r[b2]) & 0xFF
+            g = (g + vg) & 0xFF
+            b = (b + vg + luma_b[b2]) & 0xFF
+        elif op == QOI_OP_RUN:
+            index[(r * 3 + g * 5 + b * 7 + a * 11) & 63] = r << 24 | g << 16 | b << 8 | a
+            run = (b1 & 0x3F) + 1
+            if run > count - skipped:
+                state.run = run - (count - skipped)
+                run = count - skipped
+            skipped += run
+            continue
+        elif op == QOI_OP_RGB:
+            r = bytes_data[p]
+            g = bytes_data[p + 1]
+            b = bytes_data[p + 2]
+            p += 3
+        else:
+            r = bytes_data[p]
+            g = bytes_data[p + 1]
+            b = bytes_data[p + 2]
+            a = bytes_data[p + 3]
+            p += 4
+
+        index[(r * 3 + g * 5 + b * 7 + a * 11) & 63] = r << 24 | g << 16 | b << 8 | a
+        skipped += 1
+
+    state.r, state.g, state.b, state.a = r, g, b, a
+    return p, skipped
+
+def _decode_region(
+    bytes_data, size: int, width: int, rows: Tuple[int, int], cols: Tuple[int, int],
+    pixels, channels: int
+) -> None:
+    """Decodes the crop rows x cols into pixels, stopping after its last row
+
+    Pixels outside the crop are only walked by _skip_pixels; a crop spanning
+    the full width is decoded in one call.
+    """
+    (y0, y1), (x0, x1) = rows, cols
+    state = _DecoderState()
+    chunks_len = size - len(qoi_padding)
+    row_len = (x1 - x0) * channels
+    px_len = (y1 - y0) * row_len
+    gap = width - (x1 - x0)
+
+    lead = y0 * width + x0
+    p, skipped = _skip_pixels(bytes_data, QOI_HEADER_SIZE, chunks_len, lead, state)
+    px_pos = 0
+    if skipped == lead:
+        # Whole rows at once when nothing is skipped between them
+        step = row_len if gap else px_len
+        while True:
+            target = px_pos + step
+            p, px_pos = _decode_pixels(bytes_data, p, chunks_len, pixels, px_pos, target, channels, state)
+            if px_pos < target or px_pos == px_len:
+                break
+            p, skipped = _skip_pixels(bytes_data, p, chunks_len, gap, state)
+            if skipped < gap:
+                break
+
+    if px_pos < px_len:
+        # Out of chunks: the last pixel repeats up to the end
+        _fill_last_pixel(pixels, px_pos, px_len, channels, state)
+
 ##### IO #################
 
-def encode(data: bytes, desc: QoiHeader, out_len: int) -> Tuple[bytearray, int]:
+def encode(
+    data: bytes, desc: QoiHeader, out_len: int, stats: Optional["QoiStats"] = None,
+    drop_opaque_alpha: bool = False, order: Optional[str] = None,
+) -> Tuple[bytearray, int]:
     """Encodes Raw RGB Pixels into Qoi Format
 
     Args:
         data (bytes): Raw RGB/RGBA data
         desc (QoiHeader): QoiHeader data
         out_len (int): Raw RGB/RGBA  data length
+        stats (Optional[QoiStats]): Collects opcode statistics and phase
+            timings when given, see pyqoi.stats
+        drop_opaque_alpha (bool): If every alpha of RGBA data is 255, write
+            a 3-channel header and encode the pixels as RGB. The chunks are
+            the same; decoders then default to 3-channel output.
+        order (Optional[str]): Channel order of data, a key of
+            QOI_CHANNEL_ORDERS with desc.channels letters; RGB/RGBA if None.
+            NumPy arrays that are strided views are read row by row in
+            place, without a contiguous copy.
 
     Returns:
         Tuple[bytearray, int]: encoded data and its length
@@ -102,120 +563,130 @@ def encode(data: bytes, desc: QoiHeader, out_len: int) -> Tuple[bytearray, int]:
     ):
         return None, 0
 
-    max_size = (
-        desc.width * desc.height * (desc.channels + 1)
-        + QOI_HEADER_SIZE
-        + len(qoi_padding)
-    )
+    offsets = _channel_offsets(order, desc.channels)
+    if offsets is None or not _pixels_fit(data, desc):
+        return None, 0
 
-    p = 0
-    encoded: bytearray = bytearray(max_size) 
+    # With every alpha at 255 the chunks of RGBA and RGB data are the same,
+    # so the 4-channel pixels are encoded as they are under an RGB header
+    header = desc
+    if drop_opaque_alpha and desc.channels == 4 and _is_opaque(data, desc, offsets):
+        header = QoiHeader(desc.width, desc.height, 3, desc.colorspace)
 
-    encoded, p = qoiWrite32(encoded, p, QOI_MAGIC)
-    encoded, p = qoiWrite32(encoded, p, desc.width)
-    encoded, p = qoiWrite32(encoded, p, desc.height)
+    if stats is not None:
+        from .stats import _encode_with_stats
+        return _encode_with_stats(data, desc, stats, offsets, header)
 
-    encoded[p] = desc.channels
-    p += 1
-    encoded[p] = desc.colorspace
-    p += 1
+    encoded: bytearray = bytearray(max_encoded_size(header))
+    p = _encode_into(data, desc, encoded, offsets, header)
 
-    pixels = data
-    index = [QoiRGBA(rgba=RGBA(r=0, g=0, b=0, a=0)) for _ in range(64)]
-    run = 0
-    px_prev = QoiRGBA(rgba=RGBA(r=0, g=0, b=0, a=255))
-    px = QoiRGBA(rgba=RGBA(r=0, g=0, b=0, a=255))
+    # Shrink in place rather than copying out encoded[:p]
+    del encoded[p:]
+    return encoded, p
 
-    px_len = desc.width * desc.height * desc.channels
-    px_end = px_len - desc.channels
-    channels = desc.channels
 
-    for px_pos in range(0, px_len, channels):
-        if channels == 4:
-            px.rgba.r = pixels[px_pos + 0]
-            px.rgba.g = pixels[px_pos + 1]
-            px.rgba.b = pixels[px_pos + 2]
-            px.rgba.a = pixels[px_pos + 3]
-        else:
-            px.rgba.r = pixels[px_pos + 0]
-            px.rgba.g = pixels[px_pos + 1]
-            px.rgba.b = pixels[px_pos + 2]
-            px.rgba.a = 255  # Set default alpha for RGB
+def max_encoded_size(desc: QoiHeader) -> int:
+    """Worst-case encoded size of an image, header and end marker included
 
-        # Update QoiRGBA.v for comparison
-        px.v = (px.rgba.r << 24) | (px.rgba.g << 16) | (px.rgba.b << 8) | px.rgba.a 
+    Args:
+        desc (QoiHeader): QoiHeader of the image
 
-        if px.v == px_prev.v:
-            run += 1
-            if run == 62 or px_pos == px_end:
-                encoded[p] = QOI_OP_RUN | (run - 1)
-                p += 1
-                run = 0
-        else:
-            if run > 0:
-                encoded[p] = QOI_OP_RUN | (run - 1)
-                p += 1
-                run = 0 
-            
-            index_pos = QOI_COLOR_HASH(px) % 64
+    Returns:
+        int: Size in bytes, None for an invalid QoiHeader
+    """
+    if (
+        desc is None
+        or desc.width == 0
+        or desc.height == 0
+        or desc.channels < 3
+        or desc.channels > 4
+        or desc.colorspace > 1
+        or desc.height >= QOI_PIXELS_MAX / desc.width
+    ):
+        return None
+    return (
+        desc.width * desc.height * (desc.channels + 1)
+        + QOI_HEADER_SIZE
+        + len(qoi_padding)
+    )
 
-            if index[index_pos].v == px.v:
-                encoded[p] = QOI_OP_INDEX | index_pos
-                p += 1 
-            else:
-                index[index_pos] = QoiRGBA(rgba=RGBA(r=px.rgba.r, g=px.rgba.g, b=px.rgba.b, a=px.rgba.a), v=px.v) 
-                if px.rgba.a == px_prev.rgba.a:
-                    vr = px.rgba.r - px_prev.rgba.r
-                    vg = px.rgba.g - px_prev.rgba.g
-                    vb = px.rgba.b - px_prev.rgba.b
-
-                    vg_r = vr - vg
-                    vg_b = vb - vg
-
-                    if -3 <= vr < 2 and -3 <= vg < 2 and -3 <= vb < 2: 
-                        encoded[p] = (
-                            QOI_OP_DIFF | ((vr + 2) << 4) | ((vg + 2) << 2) | (vb + 2) 
-                        )
-                        p += 1
-                    elif -8 <= vg_r <= 7 and -33 <= vg <= 31 and -8 <= vg_b <= 7: 
-                        encoded[p] = QOI_OP_LUMA | (vg + 32)
-                        p += 1
-                        encoded[p] = ((vg_r + 8) << 4) | (vg_b + 8)
-                        p += 1
-                    else:
-                        encoded[p] = QOI_OP_RGB
-                        p += 1
-                        encoded[p] = px.rgba.r
-                        p += 1
-                        encoded[p] = px.rgba.g
-                        p += 1
-                        encoded[p] = px.rgba.b
-                        p += 1
-                else:
-                    encoded[p] = QOI_OP_RGBA
-                    p += 1
-                    encoded[p] = px.rgba.r
-                    p += 1
-                    encoded[p] = px.rgba.g
-                    p += 1
-                    encoded[p] = px.rgba.b
-                    p += 1
-                    encoded[p] = px.rgba.a
-                    p += 1
+def _encode_data(data, desc: QoiHeader, encoded, p: int, state: _EncoderState, offsets) -> int:
+    """Encodes all pixels of data at p and returns the new end"""
+    if _is_strided(data):
+        # Each row of a strided view is viewed in place when its pixels
+        # are contiguous, and copied alone otherwise
+        for row in data[: desc.height]:
+            p = _encode_pixels(_as_byte_view(row), desc.channels, encoded, p, state, offsets)
+        return p
+    px_len = desc.width * desc.height * desc.channels
+    return _encode_pixels(_as_byte_view(data)[:px_len], desc.channels, encoded, p, state, offsets)
 
-        px_prev = QoiRGBA(rgba=RGBA(r=px.rgba.r, g=px.rgba.g, b=px.rgba.b, a=px.rgba.a), v=px.v) 
+def _encode_into(data, desc: QoiHeader, encoded, offsets, header: Optional[QoiHeader] = None) -> int:
+    """Encodes data, laid out as desc describes, under header (desc if None)"""
+    p = _write_header(encoded, 0, header or desc)
+    state = _EncoderState()
+    p = _encode_data(data, desc, encoded, p, state, offsets)
+    return _encode_finish(encoded, p, state)
 
-    for i in range(len(qoi_padding)):
-        encoded[p] = qoi_padding[i]
-        p += 1
-    
-    return encoded[:p], p
+def encode_into(data: bytes, desc: QoiHeader, out, order: Optional[str] = None) -> int:
+    """Encodes Raw RGB Pixels into a caller-provided buffer
+
+    Args:
+        data (bytes): Raw RGB/RGBA data
+        desc (QoiHeader): QoiHeader data
+        out: Writable buffer (bytearray, memoryview, NumPy array, ...) of
+            at least max_encoded_size(desc) bytes
+        order (Optional[str]): Channel order of data, see encode
+
+    Returns:
+        int: Number of bytes written to the start of out, 0 on invalid
+            input or too small a buffer
+    """
+    max_size = max_encoded_size(desc)
+    if data is None or out is None or max_size is None:
+        return 0
+    offsets = _channel_offsets(order, desc.channels)
+    if offsets is None:
+        return 0
+
+    encoded = out if isinstance(out, bytearray) else _as_byte_view(out)
+    if not _pixels_fit(data, desc) or len(encoded) < max_size:
+        return 0
+    return _encode_into(data, desc, encoded, offsets)
+
+
+def decode(
+    data: bytes, size: int, desc: QoiHeader, channels: int = 0, out=None,
+    stats: Optional["QoiStats"] = None, order: Optional[str] = None,
+    rows: Optional[Tuple[int, int]] = None, cols: Optional[Tuple[int, int]] = None,
+) -> bytes:
+    """Decodes Encoded Qoi Image into Raw pixels
 
+    Args:
+        data (bytes): QOI encoded data; any buffer-protocol object
+            (bytes, bytearray, memoryview, mmap, ...) is read in place
+        size (int): Size of the encoded data
+        desc (QoiHeader): QoiHeader to populate
+        channels (int): Desired color channels (0 to use the file's channels)
+        out: Optional writable buffer (bytearray, NumPy array, ...) of at
+            least width * height * channels bytes to decode into
+        stats (Optional[QoiStats]): Collects opcode statistics and phase
+            timings when given, see pyqoi.stats
+        order (Optional[str]): Channel order of the output, a key of
+            QOI_CHANNEL_ORDERS; it also sets the number of channels
+        rows (Optional[Tuple[int, int]]): Decode only rows y0 to y1 (exclusive);
+            decoding stops after row y1 - 1
+        cols (Optional[Tuple[int, int]]): Decode only columns x0 to x1
+            (exclusive). With rows or cols the output holds just the crop and
+            out needs only its size; not supported together with stats
 
-def decode(data: bytes, size: int, desc: QoiHeader, channels: int = 0) -> bytes: 
-    """Decodes Encoded Qoi Image into Raw pixels"""
-    p: int = 0
-    run: int = 0
+    Returns:
+        bytes: Pixel data as bytearray, or out when given; None on invalid input
+    """
+    if order is not None:
+        if order not in QOI_CHANNEL_ORDERS or channels not in (0, len(order)):
+            return None
+        channels = len(order)
 
     if (
         data is None
@@ -225,114 +696,74 @@ def decode(data: bytes, size: int, desc: QoiHeader, channels: int = 0) -> bytes:
     ):
         return None
 
-    # Convert bytes to list of integers for processing
-    bytes_data = [b for b in data]  
+    # Read straight from the caller's buffer instead of copying it
+    bytes_data = _as_byte_view(data)
 
-    header_magic, p = qoiRead32(bytes_data, p)
-    desc.width, p = qoiRead32(bytes_data, p)
-    desc.height, p = qoiRead32(bytes_data, p)
-    desc.channels = bytes_data[p]
-    p += 1
-    desc.colorspace = bytes_data[p]
-    p += 1
-
-    if (
-        desc.width == 0
-        or desc.height == 0
-        or desc.channels < 3
-        or desc.channels > 4
-        or desc.colorspace > 1
-        or header_magic != QOI_MAGIC
-        or desc.height >= QOI_PIXELS_MAX / desc.width
-    ):
+    if not _read_header(bytes_data, desc):
         return None
 
     if channels == 0:
         channels = desc.channels
 
-    px_len: int = desc.width * desc.height * channels
-    pixels = bytearray(px_len)
-
-    if not pixels:
+    region = rows is not None or cols is not None
+    y0, y1 = rows if rows is not None else (0, desc.height)
+    x0, x1 = cols if cols is not None else (0, desc.width)
+    if region and (
+        stats is not None or not 0 <= y0 < y1 <= desc.height or not 0 <= x0 < x1 <= desc.width
+    ):
         return None
 
-    index = [QoiRGBA(rgba=RGBA(r=0, g=0, b=0, a=0), v=0) for _ in range(64)] 
-    px = QoiRGBA(rgba=RGBA(r=0, g=0, b=0, a=255), v=0) 
-    px.v = (px.rgba.r << 24) | (px.rgba.g << 16) | (px.rgba.b << 8) | px.rgba.a  # Set initial v value
+    px_len: int = (y1 - y0) * (x1 - x0) * channels
+    if out is None:
+        pixels = bytearray(px_len)
+    else:
+        pixels = _as_byte_view(out)
+        if len(pixels) < px_len:
+            return None
 
-    chunks_len = size - len(qoi_padding) 
-    for px_pos in range(0, px_len, channels):
-        if run > 0:
-            run -= 1
-        elif p < chunks_len:
-            b1 = bytes_data[p] 
-            p += 1
-
-            if b1 == QOI_OP_RGB:
-                px.rgba.r = bytes_data[p] 
-                p += 1
-                px.rgba.g = bytes_data[p]
-                p += 1
-                px.rgba.b = bytes_data[p]
-                p += 1
-            elif b1 == QOI_OP_RGBA:
-                px.rgba.r = bytes_data[p]
-                p += 1
-                px.rgba.g = bytes_data[p]
-                p += 1
-                px.rgba.b = bytes_data[p]
-                p += 1
-                px.rgba.a = bytes_data[p]
-                p += 1
-            elif (b1 & QOI_MASK_2) == QOI_OP_INDEX:
-                idx = b1 & 0x3F  
-                px.rgba.r = index[idx].rgba.r
-                px.rgba.g = index[idx].rgba.g
-                px.rgba.b = index[idx].rgba.b
-                px.rgba.a = index[idx].rgba.a
-            elif (b1 & QOI_MASK_2) == QOI_OP_DIFF:
-                px.rgba.r = (px.rgba.r + ((b1 >> 4) & 0x03) - 2) & 0xFF
-                px.rgba.g = (px.rgba.g + ((b1 >> 2) & 0x03) - 2) & 0xFF
-                px.rgba.b = (px.rgba.b + (b1 & 0x03) - 2) & 0xFF
-            elif (b1 & QOI_MASK_2) == QOI_OP_LUMA:
-                b2 = bytes_data[p]  
-                p += 1
-                vg = (b1 & 0x3F) - 32
-                vg_r = ((b2 >> 4) & 0x0F) - 8
-                vg_b = (b2 & 0x0F) - 8
-                px.rgba.r = (px.rgba.r + vg + vg_r) & 0xFF
-                px.rgba.g = (px.rgba.g + vg) & 0xFF
-                px.rgba.b = (px.rgba.b + vg + vg_b) & 0xFF
-            elif (b1 & QOI_MASK_2) == QOI_OP_RUN:
-                run = (b1 & 0x3F)
-            
-            # Update v value and index
-            px.v = (px.rgba.r << 24) | (px.rgba.g << 16) | (px.rgba.b << 8) | px.rgba.a
-            index_pos = QOI_COLOR_HASH(px) % 64
-            index[index_pos] = QoiRGBA(rgba=RGBA(r=px.rgba.r, g=px.rgba.g, b=px.rgba.b, a=px.rgba.a), v=px.v)
-
-        if channels == 4:
-            pixels[px_pos + 0] = px.rgba.r
-            pixels[px_pos + 1] = px.rgba.g
-            pixels[px_pos + 2] = px.rgba.b
-            pixels[px_pos + 3] = px.rgba.a
-        else:
-            pixels[px_pos + 0] = px.rgba.r
-            pixels[px_pos + 1] = px.rgba.g
-            pixels[px_pos + 2] = px.rgba.b
-
-    return pixels
+    if not pixels:
+        return None
 
-def read(filename: str, desc: QoiHeader, channels: Optional[int] = 0) -> bytes: 
+    if stats is not None:
+        from .stats import _decode_with_stats
+        _decode_with_stats(bytes_data, size, desc, channels, pixels, px_len, stats)
+    elif region:
+        _decode_region(bytes_data, size, desc.width, (y0, y1), (x0, x1), pixels, channels)
+    else:
+        state = _DecoderState()
+        chunks_len = size - len(qoi_padding)
+        _, px_pos = _decode_pixels(
+            bytes_data, QOI_HEADER_SIZE, chunks_len, pixels, 0, px_len, channels, state
+        )
+        if px_pos < px_len:
+            # Out of chunks: the last pixel repeats up to the end
+            _fill_last_pixel(pixels, px_pos, px_len, channels, state)
+
+    if order is not None and order not in ("RGB", "RGBA"):
+        _reorder_channels(pixels, px_len, channels, QOI_CHANNEL_ORDERS[order])
+
+    return pixels if out is None else out
+
+def read(
+    filename: str, desc: QoiHeader, channels: Optional[int] = 0, out=None,
+    rows: Optional[Tuple[int, int]] = None, cols: Optional[Tuple[int, int]] = None,
+) -> bytes: 
     """Reads a Qoi Image from a file
 
+    The file is memory-mapped and decoded straight from the mapping, so it
+    is never copied into a bytes object.
+
     Args:
         filename (str): Path to QOI file
         desc (QoiHeader): QoiHeader to populate
         channels (Optional[int]): Desired color channels (0 to use file's channels)
+        out: Optional writable buffer to decode into, see decode
+        rows (Optional[Tuple[int, int]]): Rows to decode, see decode; pages of
+            the file past the last row are never read
+        cols (Optional[Tuple[int, int]]): Columns to decode, see decode
 
     Returns:
-        bytes: Pixel data as bytes
+        bytes: Pixel data as bytes, or out when given
     """
 
     # check is the file exists
@@ -342,25 +773,98 @@ def read(filename: str, desc: QoiHeader, channels: Optional[int] = 0) -> bytes:
 
     # create file object f
     with open(filename, "rb") as f:
-        # seek the end of the file
-        f.seek(0, 2)
-        
-        # get the file size
-        size: int = f.tell()
-        
-        # go to the beginning of the file again
-        f.seek(0)
-        
-        # read the file
-        file_data = f.read(size)
-    
-    # Decode the QOI data
-    pixels = decode(file_data, size, desc, channels)
+        size: int = os.fstat(f.fileno()).st_size
+
+        # Empty files cannot be mapped, and hold no image anyway
+        if size < QOI_HEADER_SIZE + len(qoi_padding):
+            return None
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as file_data:
+            # Decode the QOI data
+            pixels = decode(file_data, size, desc, channels, out, rows=rows, cols=cols)
     
     return pixels
 
 
-def write(filename: str, data: bytes, desc: QoiHeader, out_len: int) -> None:
+def read_header(source) -> QoiHeader:
+    """Reads only the 14 byte header of a Qoi Image
+
+    Args:
+        source: Path to a QOI file, or QOI encoded data in any buffer
+
+    Returns:
+        QoiHeader: The header, None if it is missing or invalid
+    """
+    if isinstance(source, (str, os.PathLike)):
+        if not os.path.isfile(source):
+            return None
+        with open(source, "rb") as f:
+            header = f.read(QOI_HEADER_SIZE)
+    elif source is None:
+        return None
+    else:
+        header = _as_byte_view(source)[:QOI_HEADER_SIZE]
+
+    desc = QoiHeader(0, 0, 0, 0)
+    if len(header) < QOI_HEADER_SIZE or not _read_header(header, desc):
+        return None
+    return desc
+
+def _validate_chunks(bytes_data, size: int, desc: QoiHeader) -> bool:
+    """Walks the chunks by their first byte alone, writing no pixels"""
+    chunks_len = size - len(qoi_padding)
+    if bytes(bytes_data[chunks_len:size]) != bytes(qoi_padding):
+        return False
+
+    sizes, spans = QOI_CHUNK_SIZE, QOI_CHUNK_SPAN
+    p = QOI_HEADER_SIZE
+    px_count = 0
+    while p < chunks_len:
+        b1 = bytes_data[p]
+        p += sizes[b1]
+        px_count += spans[b1]
+
+    # The last chunk must end right at the end marker
+    return p == chunks_len and px_count == desc.width * desc.height
+
+def validate(source, desc: Optional[QoiHeader] = None) -> bool:
+    """Checks a Qoi Image without decoding it
+
+    The header must be valid, the chunks must cover exactly width * height
+    pixels and be followed by the end marker.
+
+    Args:
+        source: Path to a QOI file, or QOI encoded data in any buffer
+        desc (Optional[QoiHeader]): QoiHeader to populate, if given
+
+    Returns:
+        bool: True if the image is well formed
+    """
+    if desc is None:
+        desc = QoiHeader(0, 0, 0, 0)
+
+    if isinstance(source, (str, os.PathLike)):
+        if not os.path.isfile(source):
+            return False
+        with open(source, "rb") as f:
+            size: int = os.fstat(f.fileno()).st_size
+            if size < QOI_HEADER_SIZE + len(qoi_padding):
+                return False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as file_data:
+                return _read_header(file_data, desc) and _validate_chunks(file_data, size, desc)
+
+    if source is None:
+        return False
+    bytes_data = _as_byte_view(source)
+    size = len(bytes_data)
+    if size < QOI_HEADER_SIZE + len(qoi_padding):
+        return False
+    return _read_header(bytes_data, desc) and _validate_chunks(bytes_data, size, desc)
+
+
+def write(
+    filename: str, data: bytes, desc: QoiHeader, out_len: int, drop_opaque_alpha: bool = False
+) -> None:
     """writes the Qoi Image to a file
     
     Args:
@@ -368,9 +872,121 @@ def write(filename: str, data: bytes, desc: QoiHeader, out_len: int) -> None:
         data (bytes): Raw pixel data
         desc (QoiHeader): Image header information
         out_len (int): Length of pixel data
+        drop_opaque_alpha (bool): Store fully opaque RGBA as RGB, see encode
     """
-    encoded, length = encode(data, desc, out_len)
+    encoded, length = encode(data, desc, out_len, drop_opaque_alpha=drop_opaque_alpha)
     
     if encoded is not None:
         with open(filename, "wb") as f:
-            f.write(encoded)
\ No newline at end of file
+            f.write(encoded)
+
+##### NumPy #################
+
+def encode_array(
+    arr: np.ndarray, colorspace: int = QOI_SRGB, drop_opaque_alpha: bool = False,
+    order: Optional[str] = None,
+) -> bytearray:
+    """Encodes a NumPy image array into Qoi Format
+
+    The QoiHeader is taken from the array's shape, and the pixels are read
+    straight from the array's memory; strided views such as crops are read
+    row by row.
+
+    Args:
+        arr (np.ndarray): (height, width, 3|4) uint8 RGB/RGBA array
+        colorspace (int): QOI_SRGB or QOI_LINEAR
+        drop_opaque_alpha (bool): Store fully opaque RGBA as RGB, see encode
+        order (Optional[str]): Channel order of arr, see encode
+
+    Returns:
+        bytearray: encoded data, None on invalid input
+    """
+    if (
+        arr is None
+        or arr.ndim != 3
+        or arr.shape[2] not in (3, 4)
+        or arr.dtype != np.uint8
+    ):
+        return None
+
+    desc = QoiHeader(
+        width=arr.shape[1],
+        height=arr.shape[0],
+        channels=arr.shape[2],
+        colorspace=colorspace,
+    )
+    encoded, _ = encode(arr, desc, arr.size, drop_opaque_alpha=drop_opaque_alpha, order=order)
+    return encoded
+
+
+def decode_array(
+    data: bytes, channels: int = 0, desc: Optional[QoiHeader] = None, out=None,
+    order: Optional[str] = None,
+    rows: Optional[Tuple[int, int]] = None, cols: Optional[Tuple[int, int]] = None,
+) -> np.ndarray:
+    """Decodes Encoded Qoi Image into a NumPy array
+
+    The returned array is a view of the decode buffer, no copy is made.
+
+    Args:
+        data (bytes): QOI encoded data; any buffer-protocol object
+        channels (int): Desired color channels (0 to use the file's channels)
+        desc (Optional[QoiHeader]): QoiHeader to populate, if given
+        out: Optional writable buffer to decode into, see decode; the
+            result is then a view of out
+        order (Optional[str]): Channel order of the result, see decode
+        rows (Optional[Tuple[int, int]]): Rows to decode, see decode
+        cols (Optional[Tuple[int, int]]): Columns to decode, see decode
+
+    Returns:
+        np.ndarray: (height, width, channels) uint8 array of the image or
+            the crop, None on invalid input
+    """
+    if data is None:
+        return None
+    if desc is None:
+        desc = QoiHeader(0, 0, 0, 0)
+
+    bytes_data = _as_byte_view(data)
+    pixels = decode(bytes_data, len(bytes_data), desc, channels, out, order=order, rows=rows, cols=cols)
+    if pixels is None:
+        return None
+
+    if order is not None:
+        channels = len(order)
+    if channels == 0:
+        channels = desc.channels
+    y0, y1 = rows if rows is not None else (0, desc.height)
+    x0, x1 = cols if cols is not None else (0, desc.width)
+    px_len = (y1 - y0) * (x1 - x0) * channels
+    return np.frombuffer(_as_byte_view(pixels), dtype=np.uint8, count=px_len).reshape(
+        y1 - y0, x1 - x0, channels
+    )
+
+
+def convert_channels(data: bytes, channels: int, to_channels: int) -> bytearray:
+    """Converts raw pixels between RGB and RGBA in one NumPy pass
+
+    Alpha is dropped going to RGB and set to 255 going to RGBA.
+
+    Args:
+        data (bytes): Raw RGB/RGBA data; any buffer-protocol object
+        channels (int): Channels of data, 3 or 4
+        to_channels (int): Channels of the result, 3 or 4
+
+    Returns:
+        bytearray: Converted pixels, None on invalid input
+    """
+    if data is None or channels not in (3, 4) or to_channels not in (3, 4):
+        return None
+    src = np.frombuffer(_as_byte_view(data), dtype=np.uint8)
+    if src.size % channels:
+        return None
+    src = src.reshape(-1, channels)
+
+    pixels = bytearray(len(src) * to_channels)
+    dst = np.frombuffer(pixels, dtype=np.uint8).reshape(-1, to_channels)
+    dst[:, :3] = src[:, :3]
+    if to_channels == 4:
+        dst[:, 3] = src[:, 3] if channels == 4 else 255
+    return pixels
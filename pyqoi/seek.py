@@ -0,0 +1,319 @@
+##### IMPORTS #######
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+import mmap
+import os
+import struct
+import zlib
+
+from .pyqoi import (
+    QoiHeader,
+    QOI_HEADER_SIZE,
+    qoi_padding,
+    encode,
+    _DecoderState,
+    _as_byte_view,
+    _decode_pixels,
+    _fill_last_pixel,
+    _read_header,
+    _skip_pixels,
+)
+
+### CONSTANTS ####
+QOI_INDEX_MAGIC = b"qoix"
+QOI_INDEX_SUFFIX = ".qidx"
+# magic, width, height, step, checkpoint count, encoded size, fingerprint
+_INDEX_HEADER = struct.Struct(">4sIIIIQI")
+# Bytes of the chunk stream hashed at each checkpoint and at its end
+_FINGERPRINT_SPAN = 16
+# row, byte offset, pending run, r, g, b, a, 64 packed index entries
+_CHECKPOINT = struct.Struct(">IQI4B64I")
+
+
+###  CLASSSES ####
+@dataclass
+class QoiCheckpoint:
+    """Decoder state at the start of a row
+
+    Attributes:
+        row (int): Row the state belongs to
+        offset (int): Byte offset of the next chunk in the file
+        run (int): Pixels of the last run chunk still to be written
+        r, g, b, a (int): Previous pixel
+        index (List[int]): 64-entry color index of packed 0xRRGGBBAA ints
+    """
+    row: int
+    offset: int
+    run: int
+    r: int
+    g: int
+    b: int
+    a: int
+    index: List[int]
+
+    def state(self) -> _DecoderState:
+        return _DecoderState(list(self.index), self.run, self.r, self.g, self.b, self.a)
+
+
+@dataclass
+class QoiSeekIndex:
+    """Checkpoints every step rows of a QOI file, kept beside it
+
+    The .qoi file itself is untouched; the index lives in a sidecar file
+    named after it with QOI_INDEX_SUFFIX appended. size and fingerprint
+    identify the encoded data the index was built from, so a stale index
+    for a rewritten file of the same dimensions is rejected.
+    """
+    width: int
+    height: int
+    step: int
+    size: int = 0
+    fingerprint: int = 0
+    checkpoints: List[QoiCheckpoint] = field(default_factory=list)
+
+    def to_bytes(self) -> bytes:
+        out = [_INDEX_HEADER.pack(
+            QOI_INDEX_MAGIC, self.width, self.height, self.step, len(self.checkpoints),
+            self.size, self.fingerprint,
+        )]
+        for cp in self.checkpoints:
+            out.append(_CHECKPOINT.pack(cp.row, cp.offset, cp.run, cp.r, cp.g, cp.b, cp.a, *cp.index))
+        return b"".join(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Optional["QoiSeekIndex"]:
+        """Parses a sidecar index, None on invalid input"""
+        if len(data) < _INDEX_HEADER.size:
+            return None
+        magic, width, height, step, count, size, fingerprint = _INDEX_HEADER.unpack_from(data, 0)
+        if (
+            magic != QOI_INDEX_MAGIC
+            or step == 0
+            or count != -(-height // step)
+            or len(data) != _INDEX_HEADER.size + count * _CHECKPOINT.size
+        ):
+            return None
+
+        index = cls(width, height, step, size, fingerprint)
+        for p in range(_INDEX_HEADER.size, len(data), _CHECKPOINT.size):
+            fields = _CHECKPOINT.unpack_from(data, p)
+            if fields[0] != len(index.checkpoints) * step:
+                return None
+            index.checkpoints.append(QoiCheckpoint(*fields[:7], list(fields[7:])))
+        return index
+
+    def save(self, filename: str) -> None:
+        with open(filename, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, filename: str) -> Optional["QoiSeekIndex"]:
+        with open(filename, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def checkpoint_for(self, row: int) -> QoiCheckpoint:
+        """Returns the last checkpoint at or before row"""
+        return self.checkpoints[min(row // self.step, len(self.checkpoints) - 1)]
+
+    def matches(self, data, size: int, desc: QoiHeader) -> bool:
+        """True if the index was built from this encoded data"""
+        return (
+            (desc.width, desc.height) == (self.width, self.height)
+            and size == self.size
+            and bool(self.checkpoints)
+            and _fingerprint(data, size, self.checkpoints) == self.fingerprint
+        )
+
+
+##### Util Functions ####
+def _fingerprint(bytes_data, size: int, checkpoints: List[QoiCheckpoint]) -> int:
+    """CRC32 of the header, the bytes at each checkpoint and the stream's end
+
+    Reads a few bytes per checkpoint, so checking it costs next to nothing
+    next to decoding.
+    """
+    crc = zlib.crc32(bytes_data[:QOI_HEADER_SIZE])
+    for cp in checkpoints:
+        crc = zlib.crc32(bytes_data[cp.offset : min(cp.offset + _FINGERPRINT_SPAN, size)], crc)
+    return zlib.crc32(bytes_data[max(QOI_HEADER_SIZE, size - 64) : size], crc)
+
+def _checkpoint(row: int, p: int, state: _DecoderState) -> QoiCheckpoint:
+    return QoiCheckpoint(row, p, state.run, state.r, state.g, state.b, state.a, list(state.index))
+
+def _decode_band(bytes_data, size: int, cp: QoiCheckpoint, width: int, rows: int, channels: int) -> bytearray:
+    """Decodes rows rows starting at cp.row"""
+    px_len = width * rows * channels
+    pixels = bytearray(px_len)
+    state = cp.state()
+    _, px_pos = _decode_pixels(
+        bytes_data, cp.offset, size - len(qoi_padding), pixels, 0, px_len, channels, state
+    )
+    if px_pos < px_len:
+        # Out of chunks: the last pixel repeats up to the end
+        _fill_last_pixel(pixels, px_pos, px_len, channels, state)
+    return pixels
+
+def _decode_file_band(filename: str, cp: QoiCheckpoint, width: int, rows: int, channels: int) -> bytearray:
+    with open(filename, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as file_data:
+            return _decode_band(file_data, size, cp, width, rows, channels)
+
+
+##### IO #################
+def build_index(data: bytes, size: int, step: int = 64) -> Optional[QoiSeekIndex]:
+    """Scans QOI data once and records a checkpoint every step rows
+
+    Args:
+        data (bytes): QOI encoded data; any buffer-protocol object
+        size (int): Size of the encoded data
+        step (int): Rows between checkpoints
+
+    Returns:
+        QoiSeekIndex: The index, None on invalid input
+    """
+    desc = QoiHeader(0, 0, 0, 0)
+    if data is None or step < 1 or size < QOI_HEADER_SIZE + len(qoi_padding):
+        return None
+    bytes_data = _as_byte_view(data)
+    if not _read_header(bytes_data, desc):
+        return None
+
+    index = QoiSeekIndex(desc.width, desc.height, step)
+    state = _DecoderState()
+    chunks_len = size - len(qoi_padding)
+    # Only the decoder state is needed at each boundary, so the bands in
+    # between are walked without writing pixels
+    p = QOI_HEADER_SIZE
+    for row in range(0, desc.height, step):
+        if row:
+            p, _ = _skip_pixels(bytes_data, p, chunks_len, desc.width * step, state)
+        index.checkpoints.append(_checkpoint(row, p, state))
+    index.size = size
+    index.fingerprint = _fingerprint(bytes_data, size, index.checkpoints)
+    return index
+
+def write_indexed(filename: str, data: bytes, desc: QoiHeader, out_len: int, step: int = 64) -> Optional[QoiSeekIndex]:
+    """Writes a QOI image and its sidecar seek index
+
+    Args:
+        filename (str): Output filename; the index goes to filename + QOI_INDEX_SUFFIX
+        data (bytes): Raw pixel data
+        desc (QoiHeader): Image header information
+        out_len (int): Length of pixel data
+        step (int): Rows between checkpoints
+
+    Returns:
+        QoiSeekIndex: The index written, None on invalid input
+    """
+    encoded, length = encode(data, desc, out_len)
+    if encoded is None:
+        return None
+    index = build_index(encoded, length, step)
+    if index is None:
+        return None
+
+    with open(filename, "wb") as f:
+        f.write(encoded)
+    index.save(filename + QOI_INDEX_SUFFIX)
+    return index
+
+def decode_rows(
+    data: bytes, size: int, index: QoiSeekIndex, y0: int, y1: int,
+    desc: Optional[QoiHeader] = None, channels: int = 0
+) -> bytearray:
+    """Decodes rows y0 to y1 (exclusive), starting from the nearest checkpoint
+
+    Args:
+        data (bytes): QOI encoded data; any buffer-protocol object
+        size (int): Size of the encoded data
+        index (QoiSeekIndex): Seek index of data
+        y0 (int): First row
+        y1 (int): Row after the last
+        desc (Optional[QoiHeader]): QoiHeader to populate, if given
+        channels (int): Desired color channels (0 to use the file's channels)
+
+    Returns:
+        bytearray: Pixels of the rows, None on invalid input or an index
+            that does not belong to data
+    """
+    if desc is None:
+        desc = QoiHeader(0, 0, 0, 0)
+    if (
+        data is None
+        or index is None
+        or (channels != 0 and channels != 3 and channels != 4)
+        or size < QOI_HEADER_SIZE + len(qoi_padding)
+    ):
+        return None
+    bytes_data = _as_byte_view(data)
+    if (
+        not _read_header(bytes_data, desc)
+        or not index.matches(bytes_data, size, desc)
+        or not 0 <= y0 < y1 <= desc.height
+    ):
+        return None
+    if channels == 0:
+        channels = desc.channels
+
+    cp = index.checkpoint_for(y0)
+    pixels = _decode_band(bytes_data, size, cp, desc.width, y1 - cp.row, channels)
+    del pixels[: (y0 - cp.row) * desc.width * channels]
+    return pixels
+
+def decode_parallel(
+    filename: str, index: Optional[QoiSeekIndex] = None,
+    desc: Optional[QoiHeader] = None, channels: int = 0, workers: Optional[int] = None
+) -> bytearray:
+    """Decodes a QOI file in row bands across worker processes
+
+    Each band starts at a checkpoint and is decoded by a worker that maps
+    the file itself, so only the decoded band is sent back.
+
+    Args:
+        filename (str): Path to QOI file
+        index (Optional[QoiSeekIndex]): Seek index, loaded from the sidecar if None
+        desc (Optional[QoiHeader]): QoiHeader to populate, if given
+        channels (int): Desired color channels (0 to use the file's channels)
+        workers (Optional[int]): Worker processes (None for one per core)
+
+    Returns:
+        bytearray: Pixel data, None on invalid input or a mismatched index
+    """
+    if desc is None:
+        desc = QoiHeader(0, 0, 0, 0)
+    if channels != 0 and channels != 3 and channels != 4:
+        return None
+    if index is None:
+        if not os.path.isfile(filename + QOI_INDEX_SUFFIX):
+            return None
+        index = QoiSeekIndex.load(filename + QOI_INDEX_SUFFIX)
+
+    if index is None or not os.path.isfile(filename):
+        return None
+    with open(filename, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        # Empty files cannot be mapped, and hold no image anyway
+        if size < QOI_HEADER_SIZE + len(qoi_padding):
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as file_data:
+            if not _read_header(file_data, desc) or not index.matches(file_data, size, desc):
+                return None
+    if channels == 0:
+        channels = desc.channels
+
+    row_size = desc.width * channels
+    bounds = [cp.row for cp in index.checkpoints[1:]] + [desc.height]
+    pixels = bytearray(row_size * desc.height)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        bands = executor.map(
+            _decode_file_band,
+            *zip(*[
+                (filename, cp, desc.width, end - cp.row, channels)
+                for cp, end in zip(index.checkpoints, bounds)
+            ]),
+        )
+        for cp, end, band in zip(index.checkpoints, bounds, bands):
+            pixels[cp.row * row_size : end * row_size] = band
+    return pixels
@@ -0,0 +1,194 @@
+##### IMPORTS #######
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+import struct
+import numpy as np
+
+from .pyqoi import QoiHeader, QOI_PIXELS_MAX, encode, decode
+
+### CONSTANTS ####
+QOI_SEQUENCE_MAGIC = b"qoiq"
+# magic, width, height, channels, colorspace
+_SEQUENCE_HEADER = struct.Struct(">4sIIBB")
+# flags, number of rectangles
+_FRAME_HEADER = struct.Struct(">BI")
+# x, y, width, height, payload length
+_RECT_HEADER = struct.Struct(">IIIII")
+QOI_FRAME_KEY = 0x01
+
+
+##### Util Functions ####
+def _dirty_rects(frame: np.ndarray, prev: np.ndarray, band_rows: int) -> List[Tuple[int, int, int, int]]:
+    """Bounding box (x, y, w, h) of the changed pixels in each band of rows"""
+    changed = (frame != prev).any(axis=2)
+    changed_rows = np.flatnonzero(changed.any(axis=1))
+    rects = []
+    for band in np.unique(changed_rows // band_rows):
+        y0 = band * band_rows
+        block = changed[y0 : y0 + band_rows]
+        rows = np.flatnonzero(block.any(axis=1))
+        cols = np.flatnonzero(block.any(axis=0))
+        rects.append((
+            int(cols[0]), int(y0 + rows[0]),
+            int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1),
+        ))
+    return rects
+
+def _read_exactly(f: BinaryIO, n: int) -> bytes:
+    data = f.read(n)
+    if len(data) != n:
+        raise ValueError("Truncated QOI sequence")
+    return data
+
+
+###  CLASSSES ####
+class QoiSequenceWriter:
+    """Writes a sequence of frames, storing only what changed
+
+    Each frame is compared to the previous one and the bounding box of the
+    changed pixels in every band of band_rows rows is encoded as its own
+    QOI image. A frame is stored as a list of these dirty rectangles; the
+    first frame, and every keyframe_interval-th one, is stored whole.
+
+    Args:
+        f (BinaryIO): Writable file object receiving the sequence
+        desc (QoiHeader): Size, channels and colorspace of every frame
+        band_rows (int): Rows per band when looking for changes
+        keyframe_interval (int): Store every n-th frame whole, 0 for only the first
+
+    Example:
+        with open("capture.qoiq", "wb") as f:
+            writer = QoiSequenceWriter(f, QoiHeader(1920, 1080, 3, QOI_SRGB))
+            for frame in frames:
+                writer.add_frame(frame)
+    """
+
+    def __init__(self, f: BinaryIO, desc: QoiHeader, band_rows: int = 16, keyframe_interval: int = 0):
+        if (
+            desc is None
+            or desc.width == 0
+            or desc.height == 0
+            or desc.channels < 3
+            or desc.channels > 4
+            or desc.colorspace > 1
+            or desc.height >= QOI_PIXELS_MAX / desc.width
+            or band_rows < 1
+            or keyframe_interval < 0
+        ):
+            raise ValueError("Invalid QoiHeader")
+
+        self.f = f
+        self.desc = desc
+        self.band_rows = band_rows
+        self.keyframe_interval = keyframe_interval
+        self.frames = 0
+        self.bytes_written = 0
+        self._prev: Optional[np.ndarray] = None
+        self._write(_SEQUENCE_HEADER.pack(
+            QOI_SEQUENCE_MAGIC, desc.width, desc.height, desc.channels, desc.colorspace
+        ))
+
+    def add_frame(self, frame: np.ndarray) -> int:
+        """Appends a frame
+
+        Args:
+            frame (np.ndarray): (height, width, channels) uint8 array;
+                strided views are fine
+
+        Returns:
+            int: Bytes written for the frame
+        """
+        desc = self.desc
+        if frame.shape != (desc.height, desc.width, desc.channels) or frame.dtype != np.uint8:
+            raise ValueError("frame does not match the sequence's QoiHeader")
+
+        key = self._prev is None or (
+            self.keyframe_interval and self.frames % self.keyframe_interval == 0
+        )
+        if key:
+            rects = [(0, 0, desc.width, desc.height)]
+        else:
+            rects = _dirty_rects(frame, self._prev, self.band_rows)
+
+        chunks = [_FRAME_HEADER.pack(QOI_FRAME_KEY if key else 0, len(rects))]
+        for x, y, w, h in rects:
+            rect_desc = QoiHeader(w, h, desc.channels, desc.colorspace)
+            crop = frame[y : y + h, x : x + w]
+            payload, length = encode(crop, rect_desc, crop.size)
+            chunks.append(_RECT_HEADER.pack(x, y, w, h, length))
+            chunks.append(payload)
+
+        if self._prev is None:
+            self._prev = np.array(frame)
+        else:
+            for x, y, w, h in rects:
+                self._prev[y : y + h, x : x + w] = frame[y : y + h, x : x + w]
+
+        self.frames += 1
+        return self._write(b"".join(chunks))
+
+    def _write(self, data: bytes) -> int:
+        self.f.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+
+class QoiSequenceReader:
+    """Reads frames written by QoiSequenceWriter
+
+    The frame is kept in one array that every dirty rectangle patches in
+    place; read_frame returns that array, so copy it to keep a frame
+    beyond the next call.
+
+    Args:
+        f (BinaryIO): Readable file object positioned at the sequence header
+    """
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        magic, width, height, channels, colorspace = _SEQUENCE_HEADER.unpack(
+            _read_exactly(f, _SEQUENCE_HEADER.size)
+        )
+        if magic != QOI_SEQUENCE_MAGIC or channels not in (3, 4) or width == 0 or height == 0:
+            raise ValueError("Invalid QOI sequence header")
+        self.desc = QoiHeader(width, height, channels, colorspace)
+        self.frames = 0
+        self.frame = np.zeros((height, width, channels), dtype=np.uint8)
+        self.last_rects: List[Tuple[int, int, int, int]] = []
+
+    def read_frame(self) -> Optional[np.ndarray]:
+        """Applies the next frame's rectangles and returns the frame
+
+        Returns:
+            np.ndarray: The current frame, None at the end of the sequence
+        """
+        head = self.f.read(_FRAME_HEADER.size)
+        if not head:
+            return None
+        if len(head) != _FRAME_HEADER.size:
+            raise ValueError("Truncated QOI sequence")
+        flags, count = _FRAME_HEADER.unpack(head)
+        if self.frames == 0 and not flags & QOI_FRAME_KEY:
+            raise ValueError("QOI sequence does not start with a keyframe")
+
+        desc = self.desc
+        self.last_rects = []
+        for _ in range(count):
+            x, y, w, h, length = _RECT_HEADER.unpack(_read_exactly(self.f, _RECT_HEADER.size))
+            if x + w > desc.width or y + h > desc.height:
+                raise ValueError("Rectangle outside the frame")
+            payload = _read_exactly(self.f, length)
+            rect_desc = QoiHeader(0, 0, 0, 0)
+            pixels = decode(payload, length, rect_desc, desc.channels)
+            if pixels is None or (rect_desc.width, rect_desc.height) != (w, h):
+                raise ValueError("Invalid QOI payload")
+            self.frame[y : y + h, x : x + w] = np.frombuffer(pixels, dtype=np.uint8).reshape(h, w, desc.channels)
+            self.last_rects.append((x, y, w, h))
+
+        self.frames += 1
+        return self.frame
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        frame = self.read_frame()
+        while frame is not None:
+            yield frame
+            frame = self.read_frame()
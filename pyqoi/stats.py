@@ -0,0 +1,193 @@
+##### IMPORTS #######
+from dataclasses import asdict, dataclass, field
+from typing import Dict
+import time
+
+from .pyqoi import (
+    QOI_OP_INDEX,
+    QOI_OP_DIFF,
+    QOI_OP_LUMA,
+    QOI_OP_RUN,
+    QOI_OP_RGB,
+    QOI_OP_RGBA,
+    QOI_OP_KIND,
+    QOI_CHUNK_SIZE,
+    QOI_CHUNK_SPAN,
+    QOI_DIFF_DR,
+    QOI_DIFF_DG,
+    QOI_DIFF_DB,
+    QOI_LUMA_VG,
+    QOI_LUMA_VG_R,
+    QOI_LUMA_VG_B,
+    QOI_HEADER_SIZE,
+    QoiHeader,
+    qoi_padding,
+    _DecoderState,
+    _EncoderState,
+    _decode_pixels,
+    _encode_data,
+    _encode_finish,
+    _fill_last_pixel,
+    _write_header,
+    max_encoded_size,
+)
+
+### CONSTANTS ####
+QOI_OP_NAMES = {
+    QOI_OP_INDEX: "INDEX",
+    QOI_OP_DIFF: "DIFF",
+    QOI_OP_LUMA: "LUMA",
+    QOI_OP_RUN: "RUN",
+    QOI_OP_RGB: "RGB",
+    QOI_OP_RGBA: "RGBA",
+}
+
+
+###  CLASSSES ####
+@dataclass
+class QoiStats:
+    """Opcode statistics collected by encode(..., stats=) and decode(..., stats=)
+
+    Passing a QoiStats switches encode and decode to an instrumented copy
+    of their outer steps; without one the plain code runs untouched. The
+    counts come from a walk over the chunk stream after the image is
+    coded, and accumulate when the same object is passed again.
+
+    Attributes:
+        op_counts (Dict[str, int]): Chunks per opcode name
+        op_bytes (Dict[str, int]): Encoded bytes per opcode name
+        pixels (int): Pixels covered by the chunks
+        index_hits (int): Pixels coded as QOI_OP_INDEX
+        index_misses (int): Pixels coded with a colour (DIFF, LUMA, RGB, RGBA)
+        hash_collisions (int): Misses whose index slot held another colour
+        run_lengths (Dict[int, int]): Number of QOI_OP_RUN chunks by length
+        phase_seconds (Dict[str, float]): Time spent per phase
+    """
+    op_counts: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(QOI_OP_NAMES.values(), 0))
+    op_bytes: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(QOI_OP_NAMES.values(), 0))
+    pixels: int = 0
+    index_hits: int = 0
+    index_misses: int = 0
+    hash_collisions: int = 0
+    run_lengths: Dict[int, int] = field(default_factory=dict)
+    phase_seconds: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def index_hit_rate(self) -> float:
+        """Share of non-run pixels found in the index"""
+        lookups = self.index_hits + self.index_misses
+        return self.index_hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict:
+        """Plain dict of every field plus index_hit_rate, ready for JSON"""
+        out = asdict(self)
+        out["index_hit_rate"] = self.index_hit_rate
+        return out
+
+    def _add_time(self, phase: str, seconds: float) -> None:
+        self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+
+
+##### Util Functions ####
+def _count_chunks(bytes_data, p: int, chunks_len: int, px_count: int, stats: QoiStats) -> None:
+    """Walks the chunks like the decoder does, counting instead of writing"""
+    kinds, names, sizes, spans = QOI_OP_KIND, QOI_OP_NAMES, QOI_CHUNK_SIZE, QOI_CHUNK_SPAN
+    op_counts, op_bytes, run_lengths = stats.op_counts, stats.op_bytes, stats.run_lengths
+    hits = misses = collisions = 0
+
+    # Slots never written hold None; the decoder reads them as transparent black
+    index = [None] * 64
+    r, g, b, a = 0, 0, 0, 255
+    px = 0
+    while px < px_count and p < chunks_len:
+        b1 = bytes_data[p]
+        op = kinds[b1]
+        name = names[op]
+        op_counts[name] += 1
+        op_bytes[name] += sizes[b1]
+
+        if op == QOI_OP_RUN:
+            run = min(spans[b1], px_count - px)
+            run_lengths[run] = run_lengths.get(run, 0) + 1
+            index[(r * 3 + g * 5 + b * 7 + a * 11) & 63] = r << 24 | g << 16 | b << 8 | a
+            px += run
+            p += 1
+            continue
+
+        if op == QOI_OP_INDEX:
+            v = index[b1] or 0
+            r, g, b, a = v >> 24, (v >> 16) & 0xFF, (v >> 8) & 0xFF, v & 0xFF
+            hits += 1
+        else:
+            if op == QOI_OP_DIFF:
+                r = (r + QOI_DIFF_DR[b1]) & 0xFF
+                g = (g + QOI_DIFF_DG[b1]) & 0xFF
+                b = (b + QOI_DIFF_DB[b1]) & 0xFF
+            elif op == QOI_OP_LUMA:
+                b2 = bytes_data[p + 1]
+                vg = QOI_LUMA_VG[b1]
+                r = (r + vg + QOI_LUMA_VG_R[b2]) & 0xFF
+                g = (g + vg) & 0xFF
+                b = (b + vg + QOI_LUMA_VG_B[b2]) & 0xFF
+            else:
+                r, g, b = bytes_data[p + 1], bytes_data[p + 2], bytes_data[p + 3]
+                if op == QOI_OP_RGBA:
+                    a = bytes_data[p + 4]
+            misses += 1
+            v = r << 24 | g << 16 | b << 8 | a
+            held = index[(r * 3 + g * 5 + b * 7 + a * 11) & 63]
+            if held is not None and held != v:
+                collisions += 1
+
+        index[(r * 3 + g * 5 + b * 7 + a * 11) & 63] = r << 24 | g << 16 | b << 8 | a
+        px += 1
+        p += sizes[b1]
+
+    stats.pixels += px
+    stats.index_hits += hits
+    stats.index_misses += misses
+    stats.hash_collisions += collisions
+
+
+##### IO #################
+def _encode_with_stats(data, desc: QoiHeader, stats: QoiStats, offsets, header: QoiHeader):
+    """The body of encode, timed per phase, followed by the chunk walk"""
+    clock = time.perf_counter
+    start = clock()
+    encoded = bytearray(max_encoded_size(header))
+    p = _write_header(encoded, 0, header)
+    state = _EncoderState()
+    setup = clock()
+    p = _encode_data(data, desc, encoded, p, state, offsets)
+    chunks = clock()
+    p = _encode_finish(encoded, p, state)
+    finish = clock()
+
+    _count_chunks(encoded, QOI_HEADER_SIZE, p - len(qoi_padding), desc.width * desc.height, stats)
+    stats._add_time("setup", setup - start)
+    stats._add_time("chunks", chunks - setup)
+    stats._add_time("finish", finish - chunks)
+    stats._add_time("analysis", clock() - finish)
+    del encoded[p:]
+    return encoded, p
+
+def _decode_with_stats(
+    bytes_data, size: int, desc: QoiHeader, channels: int, pixels, px_len: int, stats: QoiStats
+) -> None:
+    """The body of decode, timed per phase, followed by the chunk walk"""
+    clock = time.perf_counter
+    start = clock()
+    state = _DecoderState()
+    chunks_len = size - len(qoi_padding)
+    _, px_pos = _decode_pixels(
+        bytes_data, QOI_HEADER_SIZE, chunks_len, pixels, 0, px_len, channels, state
+    )
+    chunks = clock()
+    if px_pos < px_len:
+        _fill_last_pixel(pixels, px_pos, px_len, channels, state)
+    finish = clock()
+
+    _count_chunks(bytes_data, QOI_HEADER_SIZE, chunks_len, desc.width * desc.height, stats)
+    stats._add_time("chunks", chunks - start)
+    stats._add_time("finish", finish - chunks)
+    stats._add_time("analysis", clock() - finish)
@@ -0,0 +1,224 @@
+##### IMPORTS #######
+from typing import BinaryIO, Iterator
+
+from .pyqoi import (
+    QoiHeader,
+    QOI_HEADER_SIZE,
+    QOI_PIXELS_MAX,
+    qoi_padding,
+    _DecoderState,
+    _EncoderState,
+    _as_byte_view,
+    _decode_pixels,
+    _encode_finish,
+    _encode_pixels,
+    _fill_last_pixel,
+    _read_header,
+    _write_header,
+)
+
+
+###  CLASSSES ####
+class QoiEncoder:
+    """Encodes an image into a file object as its pixels arrive
+
+    Pixels are fed in batches of whole pixels, for example one scanline at
+    a time, and the encoded bytes are written out through a buffer of
+    bounded size. Memory use does not grow with the image.
+
+    Args:
+        f (BinaryIO): Writable file object receiving the encoded image
+        desc (QoiHeader): QoiHeader of the image
+        buffer_pixels (int): Most pixels encoded per write to f
+
+    Example:
+        with open("out.qoi", "wb") as f, QoiEncoder(f, desc) as encoder:
+            for row in rows:
+                encoder.feed(row)
+    """
+
+    def __init__(self, f: BinaryIO, desc: QoiHeader, buffer_pixels: int = 65536):
+        if (
+            desc is None
+            or desc.width == 0
+            or desc.height == 0
+            or desc.channels < 3
+            or desc.channels > 4
+            or desc.colorspace > 1
+            or desc.height >= QOI_PIXELS_MAX / desc.width
+            or buffer_pixels < 1
+        ):
+            raise ValueError("Invalid QoiHeader")
+
+        self.f = f
+        self.desc = desc
+        self.closed = False
+        self.bytes_written = 0
+
+        self._state = _EncoderState()
+        self._pixels_left = desc.width * desc.height
+        self._buffer_pixels = buffer_pixels
+        # One batch of pixels and a pending run flushed before it, or the
+        # header, or the final run and end marker
+        self._buffer = bytearray(
+            max(
+                buffer_pixels * (desc.channels + 1) + 1,
+                QOI_HEADER_SIZE,
+                1 + len(qoi_padding),
+            )
+        )
+
+        self._flush(_write_header(self._buffer, 0, desc))
+
+    def feed(self, data: bytes) -> None:
+        """Encodes the next pixels of the image
+
+        Args:
+            data (bytes): Raw RGB/RGBA data holding whole pixels
+        """
+        if self.closed:
+            raise ValueError("feed() on a closed QoiEncoder")
+
+        pixels = _as_byte_view(data)
+        channels = self.desc.channels
+        if len(pixels) % channels:
+            raise ValueError("data must hold whole pixels")
+        count = len(pixels) // channels
+        if count > self._pixels_left:
+            raise ValueError("more pixels than the QoiHeader declares")
+
+        step = self._buffer_pixels * channels
+        for start in range(0, len(pixels), step):
+            p = _encode_pixels(
+                pixels[start : start + step], channels, self._buffer, 0, self._state
+            )
+            self._flush(p)
+        self._pixels_left -= count
+
+    def close(self) -> None:
+        """Flushes the final run and the end marker
+
+        The file object itself is left open.
+        """
+        if self.closed:
+            return
+        if self._pixels_left:
+            raise ValueError("%d pixels still missing" % self._pixels_left)
+        self._flush(_encode_finish(self._buffer, 0, self._state))
+        self.closed = True
+
+    def _flush(self, p: int) -> None:
+        with memoryview(self._buffer) as view:
+            self.f.write(view[:p])
+        self.bytes_written += p
+
+    def __enter__(self) -> "QoiEncoder":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+
+
+class QoiDecoder:
+    """Decodes an image from a file object one scanline at a time
+
+    The file is read in blocks of read_size bytes and only the chunks not
+    yet decoded are kept, so memory use is about one row plus one block.
+
+    Args:
+        f (BinaryIO): Readable file object positioned at the QOI header
+        channels (int): Desired color channels (0 to use the file's channels)
+        read_size (int): Bytes read from f at a time
+
+    Example:
+        with open("in.qoi", "rb") as f:
+            for row in QoiDecoder(f):
+                ...
+    """
+
+    def __init__(self, f: BinaryIO, channels: int = 0, read_size: int = 65536):
+        if (channels != 0 and channels != 3 and channels != 4) or read_size < 1:
+            raise ValueError("Invalid channels or read_size")
+
+        self.f = f
+        self.desc = QoiHeader(0, 0, 0, 0)
+        header = self._read_exactly(QOI_HEADER_SIZE)
+        if len(header) < QOI_HEADER_SIZE or not _read_header(header, self.desc):
+            raise ValueError("Invalid QOI header")
+
+        self.channels = channels or self.desc.channels
+        self.row_size = self.desc.width * self.channels
+        self.rows_left = self.desc.height
+
+        self._state = _DecoderState()
+        self._read_size = read_size
+        self._data = bytearray()
+        self._p = 0
+        self._size = QOI_HEADER_SIZE
+        self._eof = False
+
+    def read_row(self, out=None):
+        """Decodes the next scanline
+
+        Args:
+            out: Optional writable buffer of at least row_size bytes
+                (bytearray, memoryview, numpy array, ...) to decode into
+
+        Returns:
+            The row as out, or as a new bytearray; None after the last row
+        """
+        if not self.rows_left:
+            return None
+        if out is None:
+            out = bytearray(self.row_size)
+        pixels = _as_byte_view(out)
+        if len(pixels) < self.row_size:
+            raise ValueError("out holds fewer than row_size bytes")
+
+        px_pos = 0
+        while True:
+            # The final 8 bytes are the end marker, never chunks
+            chunks_len = len(self._data) - len(qoi_padding)
+            self._p, px_pos = _decode_pixels(
+                self._data, self._p, chunks_len, pixels, px_pos, self.row_size,
+                self.channels, self._state,
+            )
+            if px_pos == self.row_size:
+                break
+            if self._eof:
+                # Out of chunks: the last pixel repeats up to the end
+                _fill_last_pixel(pixels, px_pos, self.row_size, self.channels, self._state)
+                break
+            self._refill()
+
+        self.rows_left -= 1
+        return out
+
+    def __iter__(self) -> Iterator[bytearray]:
+        row = self.read_row()
+        while row is not None:
+            yield row
+            row = self.read_row()
+
+    def _refill(self) -> None:
+        # Keep only the undecoded tail before appending the next block
+        del self._data[: self._p]
+        self._p = 0
+        block = self.f.read(self._read_size)
+        if block:
+            self._data += block
+            self._size += len(block)
+        elif self._size < QOI_HEADER_SIZE + len(qoi_padding):
+            raise ValueError("Truncated QOI data")
+        else:
+            self._eof = True
+
+    def _read_exactly(self, n: int) -> bytes:
+        data = b""
+        while len(data) < n:
+            block = self.f.read(n - len(data))
+            if not block:
+                break
+            data += block
+        return data
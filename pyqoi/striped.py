@@ -0,0 +1,222 @@
+##### IMPORTS #######
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, List, Optional, Tuple
+import os
+import struct
+
+from .pyqoi import (
+    QoiHeader,
+    QOI_HEADER_SIZE,
+    QOI_PIXELS_MAX,
+    qoi_padding,
+    encode,
+    decode,
+    _as_byte_view,
+    _read_header,
+)
+from .stream import QoiEncoder
+
+### CONSTANTS ####
+QOI_STRIPED_MAGIC = b"qois"
+# magic, width, height, channels, colorspace, rows per band, band count
+_STRIPED_HEADER = struct.Struct(">4sIIBBII")
+_OFFSET = struct.Struct(">Q")
+
+
+##### Util Functions ####
+def _map(fn, args: List[tuple], workers: Optional[int]) -> list:
+    """Runs fn over args, in worker processes unless workers is 1"""
+    if workers == 1 or len(args) < 2:
+        return [fn(*a) for a in args]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fn, *zip(*args)))
+
+def _encode_band(data: bytes, desc: QoiHeader) -> bytes:
+    encoded, length = encode(data, desc, len(data))
+    return bytes(encoded)
+
+def _decode_band(data: bytes, channels: int) -> bytearray:
+    return decode(data, len(data), QoiHeader(0, 0, 0, 0), channels)
+
+def _read_container(bytes_data, desc: QoiHeader) -> Optional[List[Tuple[int, int]]]:
+    """Populates desc and returns the (start, end) of every band, None if invalid"""
+    if len(bytes_data) < _STRIPED_HEADER.size:
+        return None
+    magic, desc.width, desc.height, desc.channels, desc.colorspace, band_rows, count = (
+        _STRIPED_HEADER.unpack_from(bytes_data, 0)
+    )
+    table_end = _STRIPED_HEADER.size + (count + 1) * _OFFSET.size
+    if (
+        magic != QOI_STRIPED_MAGIC
+        or desc.width == 0
+        or desc.height == 0
+        or desc.channels < 3
+        or desc.channels > 4
+        or desc.colorspace > 1
+        or desc.height >= QOI_PIXELS_MAX / desc.width
+        or band_rows == 0
+        or count != -(-desc.height // band_rows)
+        or len(bytes_data) < table_end
+    ):
+        return None
+
+    offsets = [
+        _OFFSET.unpack_from(bytes_data, _STRIPED_HEADER.size + i * _OFFSET.size)[0]
+        for i in range(count + 1)
+    ]
+    if offsets[0] != table_end or offsets[-1] != len(bytes_data) or offsets != sorted(offsets):
+        return None
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+##### IO #################
+def encode_striped(
+    data: bytes, desc: QoiHeader, out_len: int, band_rows: int = 256, workers: Optional[int] = None
+) -> bytes:
+    """Encodes an image as independent QOI bands in parallel
+
+    Every band_rows rows form a complete QOI stream with a fresh index and
+    previous pixel, so bands encode and decode on separate cores at a
+    small cost in compression. The bands are stored after a header and an
+    offset table; join_striped turns the container into a standard .qoi.
+
+    Args:
+        data (bytes): Raw RGB/RGBA data
+        desc (QoiHeader): QoiHeader of the image
+        out_len (int): Length of pixel data
+        band_rows (int): Rows per band
+        workers (Optional[int]): Worker processes (None for one per core, 1 for none)
+
+    Returns:
+        bytes: The striped container, None on invalid input
+    """
+    if (
+        data is None
+        or desc is None
+        or band_rows < 1
+        or desc.width == 0
+        or desc.height == 0
+        or desc.channels < 3
+        or desc.channels > 4
+        or desc.colorspace > 1
+        or desc.height >= QOI_PIXELS_MAX / desc.width
+    ):
+        return None
+    pixels = _as_byte_view(data)
+    row_len = desc.width * desc.channels
+    if min(out_len, len(pixels)) < row_len * desc.height:
+        return None
+
+    args = []
+    for y in range(0, desc.height, band_rows):
+        rows = min(band_rows, desc.height - y)
+        band_desc = QoiHeader(desc.width, rows, desc.channels, desc.colorspace)
+        args.append((bytes(pixels[y * row_len : (y + rows) * row_len]), band_desc))
+    bands = _map(_encode_band, args, workers)
+
+    offset = _STRIPED_HEADER.size + (len(bands) + 1) * _OFFSET.size
+    out = [
+        _STRIPED_HEADER.pack(
+            QOI_STRIPED_MAGIC, desc.width, desc.height, desc.channels, desc.colorspace,
+            band_rows, len(bands),
+        )
+    ]
+    for band in bands:
+        out.append(_OFFSET.pack(offset))
+        offset += len(band)
+    out.append(_OFFSET.pack(offset))
+    out.extend(bands)
+    return b"".join(out)
+
+def decode_striped(
+    data: bytes, desc: Optional[QoiHeader] = None, channels: int = 0, workers: Optional[int] = None
+) -> bytearray:
+    """Decodes a striped container, one band per worker
+
+    Args:
+        data (bytes): Striped container; any buffer-protocol object
+        desc (Optional[QoiHeader]): QoiHeader to populate, if given
+        channels (int): Desired color channels (0 to use the file's channels)
+        workers (Optional[int]): Worker processes (None for one per core, 1 for none)
+
+    Returns:
+        bytearray: Pixel data, None on invalid input
+    """
+    if desc is None:
+        desc = QoiHeader(0, 0, 0, 0)
+    if data is None or (channels != 0 and channels != 3 and channels != 4):
+        return None
+    bytes_data = _as_byte_view(data)
+    spans = _read_container(bytes_data, desc)
+    if spans is None:
+        return None
+
+    bands = _map(
+        _decode_band, [(bytes(bytes_data[start:end]), channels) for start, end in spans], workers
+    )
+    if any(band is None for band in bands):
+        return None
+    pixels = bytearray().join(bands)
+    if len(pixels) != desc.width * desc.height * (channels or desc.channels):
+        return None
+    return pixels
+
+def join_striped(data: bytes, f: BinaryIO) -> int:
+    """Re-encodes a striped container as a single standard QOI stream
+
+    Bands are decoded one at a time and fed to a QoiEncoder, so memory
+    stays around one band.
+
+    Args:
+        data (bytes): Striped container; any buffer-protocol object
+        f (BinaryIO): Writable file object receiving the .qoi image
+
+    Returns:
+        int: Bytes written, None on invalid input
+    """
+    desc = QoiHeader(0, 0, 0, 0)
+    if data is None:
+        return None
+    bytes_data = _as_byte_view(data)
+    spans = _read_container(bytes_data, desc)
+    if spans is None:
+        return None
+
+    # Check every band header before anything is written
+    rows = 0
+    for start, end in spans:
+        band_desc = QoiHeader(0, 0, 0, 0)
+        if (
+            end - start < QOI_HEADER_SIZE + len(qoi_padding)
+            or not _read_header(bytes_data[start:end], band_desc)
+            or (band_desc.width, band_desc.channels) != (desc.width, desc.channels)
+        ):
+            return None
+        rows += band_desc.height
+    if rows != desc.height:
+        return None
+
+    with QoiEncoder(f, desc) as encoder:
+        for start, end in spans:
+            encoder.feed(decode(bytes_data[start:end], end - start, QoiHeader(0, 0, 0, 0)))
+    return encoder.bytes_written
+
+def write_striped(
+    filename: str, data: bytes, desc: QoiHeader, out_len: int,
+    band_rows: int = 256, workers: Optional[int] = None
+) -> None:
+    """Writes an image as a striped container, see encode_striped"""
+    encoded = encode_striped(data, desc, out_len, band_rows, workers)
+    if encoded is not None:
+        with open(filename, "wb") as f:
+            f.write(encoded)
+
+def read_striped(
+    filename: str, desc: QoiHeader, channels: int = 0, workers: Optional[int] = None
+) -> bytearray:
+    """Reads a striped container, see decode_striped"""
+    if not os.path.isfile(filename):
+        return None
+    with open(filename, "rb") as f:
+        data = f.read()
+    return decode_striped(data, desc, channels, workers)
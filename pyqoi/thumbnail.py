@@ -0,0 +1,162 @@
+##### IMPORTS #######
+from typing import Callable, Optional
+import mmap
+import os
+import numpy as np
+
+from .pyqoi import (
+    QoiHeader,
+    QOI_HEADER_SIZE,
+    qoi_padding,
+    _DecoderState,
+    _as_byte_view,
+    _decode_pixels,
+    _fill_last_pixel,
+    _read_header,
+    _skip_pixels,
+)
+from .stream import QoiDecoder
+
+
+##### Util Functions ####
+def _reduce_band(band: np.ndarray, factor: int, box: bool) -> np.ndarray:
+    """Shrinks a (rows, width, channels) band of up to factor rows to one row"""
+    if not box:
+        return band[0, ::factor]
+    width = band.shape[1]
+    starts = np.arange(0, width, factor)
+    sums = np.add.reduceat(band.sum(axis=0, dtype=np.uint32), starts, axis=0)
+    # Blocks on the right and bottom edges may be partial
+    counts = (np.diff(np.append(starts, width)) * band.shape[0])[:, None]
+    return (sums + counts // 2) // counts
+
+def _reduce(
+    read_rows: Callable[[np.ndarray], None], skip_rows: Callable[[int], None],
+    height: int, factor: int, box: bool, scratch: np.ndarray, out: np.ndarray
+) -> None:
+    """Fills out row by row from bands of factor source rows
+
+    read_rows decodes the next len(rows) rows into rows; for nearest
+    sampling only the first row of a band is decoded and the rest are
+    passed to skip_rows. Nothing after the last band is decoded.
+    """
+    for oy in range(out.shape[0]):
+        n = min(factor, height - oy * factor)
+        band = scratch[:n] if box else scratch[:1]
+        read_rows(band)
+        out[oy] = _reduce_band(band, factor, box)
+        if not box and oy + 1 < out.shape[0]:
+            skip_rows(n - 1)
+
+def _reduce_buffer(
+    bytes_data, size: int, desc: QoiHeader, channels: int, factor: int, box: bool,
+    scratch: np.ndarray, out: np.ndarray
+) -> None:
+    state = _DecoderState()
+    chunks_len = size - len(qoi_padding)
+    row_len = desc.width * channels
+    p = QOI_HEADER_SIZE
+
+    def read_rows(rows: np.ndarray) -> None:
+        nonlocal p
+        pixels = _as_byte_view(rows)
+        px_len = len(rows) * row_len
+        p, px_pos = _decode_pixels(bytes_data, p, chunks_len, pixels, 0, px_len, channels, state)
+        if px_pos < px_len:
+            # Out of chunks: the last pixel repeats up to the end
+            _fill_last_pixel(pixels, px_pos, px_len, channels, state)
+
+    def skip_rows(n: int) -> None:
+        nonlocal p
+        p, _ = _skip_pixels(bytes_data, p, chunks_len, n * desc.width, state)
+
+    _reduce(read_rows, skip_rows, desc.height, factor, box, scratch, out)
+
+
+##### IO #################
+def decode_thumbnail(
+    source, factor: int, channels: int = 0, box: bool = False,
+    desc: Optional[QoiHeader] = None, out=None
+) -> np.ndarray:
+    """Decodes a Qoi Image reduced by an integer factor
+
+    The image is walked in bands of factor rows and each band is reduced
+    as soon as it is decoded, so memory stays at one band plus the
+    result. With nearest sampling only every factor-th row is decoded;
+    the rows in between only advance the decoder state.
+
+    Args:
+        source: Path to a QOI file, QOI encoded data in any buffer, or a
+            binary file object, which is decoded row by row with QoiDecoder
+        factor (int): Reduction factor, e.g. 2, 4 or 8; the result is
+            ceil(height / factor) x ceil(width / factor)
+        channels (int): Desired color channels (0 to use the file's channels)
+        box (bool): Average each factor x factor block instead of taking
+            its top-left pixel
+        desc (Optional[QoiHeader]): QoiHeader to populate with the full
+            size header, if given
+        out: Optional writable buffer for the result
+
+    Returns:
+        np.ndarray: (height, width, channels) uint8 array, None on invalid input
+    """
+    if source is None or factor < 1 or channels not in (0, 3, 4):
+        return None
+    if desc is None:
+        desc = QoiHeader(0, 0, 0, 0)
+
+    if isinstance(source, (str, os.PathLike)):
+        if not os.path.isfile(source):
+            return None
+        with open(source, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # Empty files cannot be mapped, and hold no image anyway
+            if size < QOI_HEADER_SIZE + len(qoi_padding):
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as file_data:
+                return decode_thumbnail(file_data, factor, channels, box, desc, out)
+
+    if hasattr(source, "read"):
+        try:
+            decoder = QoiDecoder(source, channels)
+        except ValueError:
+            return None
+        header = decoder.desc
+        channels = decoder.channels
+    else:
+        bytes_data = _as_byte_view(source)
+        header = QoiHeader(0, 0, 0, 0)
+        if len(bytes_data) < QOI_HEADER_SIZE + len(qoi_padding) or not _read_header(bytes_data, header):
+            return None
+        channels = channels or header.channels
+
+    shape = (-(-header.height // factor), -(-header.width // factor), channels)
+    if out is None:
+        result = np.empty(shape, dtype=np.uint8)
+    else:
+        view = _as_byte_view(out)
+        if len(view) < shape[0] * shape[1] * channels:
+            return None
+        result = np.frombuffer(view, dtype=np.uint8, count=shape[0] * shape[1] * channels).reshape(shape)
+    scratch = np.empty((factor if box else 1, header.width, channels), dtype=np.uint8)
+
+    if hasattr(source, "read"):
+        def read_rows(rows: np.ndarray) -> None:
+            for row in rows:
+                decoder.read_row(row)
+
+        def skip_rows(n: int) -> None:
+            for _ in range(n):
+                decoder.read_row(scratch[0])
+
+        try:
+            _reduce(read_rows, skip_rows, header.height, factor, box, scratch, result)
+        except ValueError:
+            # Truncated stream
+            return None
+    else:
+        _reduce_buffer(bytes_data, len(bytes_data), header, channels, factor, box, scratch, result)
+
+    desc.width, desc.height = header.width, header.height
+    desc.channels, desc.colorspace = header.channels, header.colorspace
+    return result
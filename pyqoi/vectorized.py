@@ -0,0 +1,515 @@
+##### IMPORTS #######
+from array import array
+from typing import Tuple
+import numpy as np
+
+from .pyqoi import (
+    QoiHeader,
+    QOI_OP_INDEX,
+    QOI_OP_DIFF,
+    QOI_OP_LUMA,
+    QOI_OP_RUN,
+    QOI_OP_RGB,
+    QOI_OP_RGBA,
+    QOI_MASK_2,
+    QOI_MAGIC,
+    QOI_HEADER_SIZE,
+    QOI_PIXELS_MAX,
+    QOI_CHUNK_SIZE,
+    QOI_CHUNK_SPAN,
+    qoi_padding,
+    qoiWrite32,
+    qoiRead32,
+    decode,
+    _as_byte_view,
+)
+
+### CONSTANTS ####
+# Per-channel deltas by first byte; LUMA red/blue still add the second byte
+_DELTA_R = np.zeros(256, dtype=np.uint8)
+_DELTA_G = np.zeros(256, dtype=np.uint8)
+_DELTA_B = np.zeros(256, dtype=np.uint8)
+for _b1 in range(QOI_OP_DIFF, QOI_OP_LUMA):
+    _DELTA_R[_b1] = (((_b1 >> 4) & 0x03) - 2) & 0xFF
+    _DELTA_G[_b1] = (((_b1 >> 2) & 0x03) - 2) & 0xFF
+    _DELTA_B[_b1] = ((_b1 & 0x03) - 2) & 0xFF
+for _b1 in range(QOI_OP_LUMA, QOI_OP_RUN):
+    _DELTA_R[_b1] = ((_b1 & 0x3F) - 32 - 8) & 0xFF
+    _DELTA_G[_b1] = ((_b1 & 0x3F) - 32) & 0xFF
+    _DELTA_B[_b1] = ((_b1 & 0x3F) - 32 - 8) & 0xFF
+del _b1
+
+# Stretches between QOI_OP_INDEX chunks shorter than this update the colour
+# index in Python, longer ones with np.unique
+_SHORT_STRETCH = 256
+
+# Above this share of QOI_OP_INDEX chunks, resolving them one by one in
+# Python costs more than the scalar decoder (flat UI and palette images)
+_MAX_INDEX_SHARE = 0.25
+
+
+##### Util Functions ####
+def _pixel_array(data, desc: QoiHeader) -> np.ndarray:
+    """Views raw pixel data as a (width * height, channels) uint8 array
+
+    Returns None if data holds fewer than the image's pixels. Strided
+    NumPy views are made contiguous first, which copies them.
+    """
+    px_len = desc.width * desc.height * desc.channels
+    if isinstance(data, np.ndarray):
+        flat = np.ascontiguousarray(data, dtype=np.uint8).reshape(-1)
+    else:
+        view = _as_byte_view(data)
+        if isinstance(view, memoryview):
+            flat = np.frombuffer(view, dtype=np.uint8)
+        else:
+            flat = np.asarray(view[:px_len], dtype=np.uint8)
+    if flat.size < px_len:
+        return None
+    return flat[:px_len].reshape(-1, desc.channels)
+
+
+def _pack_pixels(px: np.ndarray) -> np.ndarray:
+    """Packs an (n, channels) uint8 array into 0xRRGGBBAA uint32 values"""
+    if px.shape[1] == 4:
+        # RGBA bytes already are big-endian 0xRRGGBBAA words
+        return np.ascontiguousarray(px).view(">u4").reshape(-1)
+    packed = px[:, 0].astype(np.uint32) << 24
+    packed |= px[:, 1].astype(np.uint32) << 16
+    packed |= px[:, 2].astype(np.uint32) << 8
+    packed |= 0xFF
+    return packed
+
+
+def _find_runs(packed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Splits the image into run starts and the run length following each
+
+    A pixel equal to its predecessor continues a run; every other pixel
+    starts a new one. The first pixel always starts a run, mirroring the
+    scalar encoder where nothing precedes it.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: positions of the pixels that start a
+        run and the number of repeated pixels that follow each of them
+    """
+    starts = np.flatnonzero(packed[1:] != packed[:-1]) + 1
+    starts = np.concatenate(([0], starts))
+    runs = np.diff(np.append(starts, packed.size)) - 1
+    return starts, runs
+
+
+def _resolve_index_hits(packed: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    """Finds the pixels that the encoder emits as QOI_OP_INDEX
+
+    Every encoded pixel leaves its own value in its index slot, either
+    because it was already there (a hit) or because it was written on a
+    miss. The slot for a hash therefore always holds the previous encoded
+    pixel with that hash, and a pixel is a hit exactly when that pixel has
+    the same value. A stable sort by hash puts those pairs next to each
+    other, so no sequential pass over the index is needed.
+    """
+    order = np.argsort(hashes, kind="stable")
+    sorted_hashes = hashes[order]
+    sorted_packed = packed[order]
+    hits = np.zeros(packed.size, dtype=bool)
+    hits[order[1:]] = (sorted_hashes[1:] == sorted_hashes[:-1]) & (
+        sorted_packed[1:] == sorted_packed[:-1]
+    )
+    return hits
+
+
+##### IO #################
+
+def encode_vectorized(data: bytes, desc: QoiHeader, out_len: int) -> Tuple[bytearray, int]:
+    """Encodes Raw RGB Pixels into Qoi Format using NumPy
+
+    Produces the same bytes as ``encode``. Runs, index hits, deltas and the
+    opcode of every pixel are computed with array operations over the whole
+    image, then all chunks are scattered into the output in one go.
+
+    Args:
+        data (bytes): Raw RGB/RGBA data
+        desc (QoiHeader): QoiHeader data
+        out_len (int): Raw RGB/RGBA  data length
+
+    Returns:
+        Tuple[bytearray, int]: encoded data and its length
+    """
+
+    if (
+        data is None
+        or out_len is None
+        or desc is None
+        or desc.width == 0
+        or desc.height == 0
+        or desc.channels < 3
+        or desc.channels > 4
+        or desc.colorspace > 1
+        or desc.height >= QOI_PIXELS_MAX / desc.width
+    ):
+        return None, 0
+
+    px = _pixel_array(data, desc)
+    if px is None:
+        return None, 0
+    packed = _pack_pixels(px)
+    starts, runs = _find_runs(packed)
+
+    # Only pixels that start a run are encoded; the rest are covered by
+    # the QOI_OP_RUN chunks that follow them.
+    heads = px[starts]
+    r = heads[:, 0].astype(np.int16)
+    g = heads[:, 1].astype(np.int16)
+    b = heads[:, 2].astype(np.int16)
+    if desc.channels == 4:
+        a = heads[:, 3].astype(np.int16)
+    else:
+        a = np.full(starts.size, 255, dtype=np.int16)
+
+    # The previous pixel of each head is the head before it, since the
+    # pixels in between repeat it; the first one follows opaque black.
+    pr = np.concatenate(([0], r[:-1]))
+    pg = np.concatenate(([0], g[:-1]))
+    pb = np.concatenate(([0], b[:-1]))
+    pa = np.concatenate(([255], a[:-1]))
+
+    hashes = ((r * 3 + g * 5 + b * 7 + a * 11) & 63).astype(np.uint8)
+    hit = _resolve_index_hits(packed[starts], hashes)
+
+    vr = r - pr
+    vg = g - pg
+    vb = b - pb
+    vg_r = vr - vg
+    vg_b = vb - vg
+
+    same_alpha = ~hit & (a == pa)
+    diff = (
+        same_alpha
+        & (vr >= -2) & (vr < 2)
+        & (vg >= -2) & (vg < 2)
+        & (vb >= -2) & (vb < 2)
+    )
+    luma = (
+        same_alpha
+        & ~diff
+        & (vg_r >= -8) & (vg_r <= 7)
+        & (vg >= -32) & (vg <= 31)
+        & (vg_b >= -8) & (vg_b <= 7)
+    )
+    rgb = same_alpha & ~diff & ~luma
+    rgba = ~hit & ~same_alpha
+
+    # Bytes per head: the opcode chunk plus the run chunks after it
+    op_size = np.ones(starts.size, dtype=np.int64)
+    op_size[luma] = 2
+    op_size[rgb] = 4
+    op_size[rgba] = 5
+    full_runs = runs // 62
+    rest_run = runs - full_runs * 62
+    size = op_size + full_runs + (rest_run > 0)
+
+    offsets = np.empty(starts.size, dtype=np.int64)
+    offsets[0] = QOI_HEADER_SIZE
+    np.cumsum(size[:-1], out=offsets[1:])
+    offsets[1:] += QOI_HEADER_SIZE
+    p = int(offsets[-1] + size[-1])
+
+    encoded: bytearray = bytearray(p + len(qoi_padding))
+    out = np.frombuffer(encoded, dtype=np.uint8)
+
+    _, p_header = qoiWrite32(encoded, 0, QOI_MAGIC)
+    _, p_header = qoiWrite32(encoded, p_header, desc.width)
+    _, p_header = qoiWrite32(encoded, p_header, desc.height)
+    encoded[p_header] = desc.channels
+    encoded[p_header + 1] = desc.colorspace
+
+    at = offsets[hit]
+    out[at] = QOI_OP_INDEX | hashes[hit]
+
+    at = offsets[diff]
+    out[at] = (
+        QOI_OP_DIFF
+        | ((vr[diff] + 2) << 4)
+        | ((vg[diff] + 2) << 2)
+        | (vb[diff] + 2)
+    )
+
+    at = offsets[luma]
+    out[at] = QOI_OP_LUMA | (vg[luma] + 32)
+    out[at + 1] = ((vg_r[luma] + 8) << 4) | (vg_b[luma] + 8)
+
+    # Literal chunks copy the pixel bytes that follow the opcode
+    at = offsets[rgb]
+    out[at] = QOI_OP_RGB
+    out[at[:, None] + np.arange(1, 4)] = heads[rgb, :3]
+
+    at = offsets[rgba]
+    out[at] = QOI_OP_RGBA
+    if desc.channels == 4:
+        out[at[:, None] + np.arange(1, 5)] = heads[rgba]
+    else:
+        out[at[:, None] + np.arange(1, 4)] = heads[rgba]
+        out[at + 4] = 255
+
+    # Runs of 62 pixels first, then the remainder of each run
+    run_at = offsets + op_size
+    total_full = int(full_runs.sum())
+    if total_full:
+        first_full = np.cumsum(full_runs) - full_runs
+        out[
+            np.repeat(run_at - first_full, full_runs) + np.arange(total_full)
+        ] = QOI_OP_RUN | 61
+    has_rest = rest_run > 0
+    out[run_at[has_rest] + full_runs[has_rest]] = QOI_OP_RUN | (rest_run[has_rest] - 1)
+
+    out[p:] = qoi_padding
+    p += len(qoi_padding)
+
+    return encoded, p
+
+
+def _tokenize(bytes_data, p: int, chunks_len: int) -> np.ndarray:
+    """Returns the offset of every chunk in the stream"""
+    starts = array("q")
+    add = starts.append
+    sizes = QOI_CHUNK_SIZE
+    while p < chunks_len:
+        add(p)
+        p += sizes[bytes_data[p]]
+    return np.frombuffer(starts, dtype=np.int64)
+
+
+def _last_anchor(is_anchor: np.ndarray) -> np.ndarray:
+    """Returns, for each chunk, the last chunk at or before it setting a value
+
+    Chunks before the first anchor get -1, which indexes the extra trailing
+    entry of the base arrays holding the decoder's initial pixel.
+    """
+    k = np.where(is_anchor, np.arange(is_anchor.size, dtype=np.int32), np.int32(-1))
+    return np.maximum.accumulate(k)
+
+
+def _resolve_index_chunks(
+    index_at, b1, is_index, is_literal, is_rgba, rgb_anchor, alpha_anchor,
+    base_r, base_g, base_b, base_a, rel_r, rel_g, rel_b,
+) -> None:
+    """Fills in the colour of every QOI_OP_INDEX chunk, in stream order
+
+    The colour index is tracked as the last chunk seen for each hash (-1 for
+    the initial transparent black). The colour hash is linear modulo 64, so
+    a chunk's hash is the hash of its anchors' colours plus a hash of the
+    deltas since them. That sum is precomputed for every chunk with the
+    index chunks counting as black; only the chunks right after an index
+    chunk, still anchored to it, need its hash added in.
+    """
+    # uint8 arithmetic wraps modulo 256, a multiple of 64
+    hash_known = (
+        (base_r * 3 + base_g * 5 + base_b * 7)[rgb_anchor]
+        + (base_a * 11)[alpha_anchor]
+        + rel_r * 3
+        + rel_g * 5
+        + rel_b * 7
+    ) & 63
+
+    # Chunks after each index chunk up to the next colour or alpha anchor
+    chunk_count = b1.size
+    rgb_anchors = np.append(np.flatnonzero(is_literal | is_index), chunk_count)
+    alpha_anchors = np.append(np.flatnonzero(is_rgba | is_index), chunk_count)
+    rgb_ends = rgb_anchors[np.searchsorted(rgb_anchors, index_at, side="right")]
+    alpha_ends = alpha_anchors[np.searchsorted(alpha_anchors, index_at, side="right")]
+
+    index = [-1] * 64
+    resolved = {}
+    done = 0
+    hash_rgb = hash_a = 0
+    rgb_end = alpha_end = 0
+    for c, slot, next_rgb_end, next_alpha_end in zip(
+        index_at.tolist(), b1[index_at].tolist(), rgb_ends.tolist(), alpha_ends.tolist()
+    ):
+        if c > done:
+            with_rgb = min(rgb_end, c) - done
+            with_a = min(alpha_end, c) - done
+            if c - done < _SHORT_STRETCH:
+                hashes = hash_known[done:c].tolist()
+                if with_rgb > 0:
+                    hashes[:with_rgb] = [h + hash_rgb for h in hashes[:with_rgb]]
+                if with_a > 0:
+                    hashes[:with_a] = [h + hash_a for h in hashes[:with_a]]
+                for k, index_pos in enumerate(hashes, done):
+                    index[index_pos & 63] = k
+            else:
+                hashes = hash_known[done:c].copy()
+                hashes[: max(with_rgb, 0)] += hash_rgb
+                hashes[: max(with_a, 0)] += hash_a
+                hashes &= 63
+                found, last = np.unique(hashes[::-1], return_index=True)
+                for index_pos, k in zip(found.tolist(), (c - 1 - last).tolist()):
+                    index[index_pos] = k
+
+        src = index[slot]
+        if src < 0:
+            r = g = b = a = 0
+        else:
+            anchor = rgb_anchor.item(src)
+            if anchor in resolved:
+                r, g, b, _ = resolved[anchor]
+            else:
+                r = base_r.item(anchor)
+                g = base_g.item(anchor)
+                b = base_b.item(anchor)
+            r = (r + rel_r.item(src)) & 0xFF
+            g = (g + rel_g.item(src)) & 0xFF
+            b = (b + rel_b.item(src)) & 0xFF
+            anchor = alpha_anchor.item(src)
+            if anchor in resolved:
+                a = resolved[anchor][3]
+            else:
+                a = base_a.item(anchor)
+
+        resolved[c] = (r, g, b, a)
+        hash_rgb = (r * 3 + g * 5 + b * 7) & 63
+        hash_a = (a * 11) & 63
+        index[(hash_rgb + hash_a) & 63] = c
+        rgb_end = next_rgb_end
+        alpha_end = next_alpha_end
+        done = c + 1
+
+    colours = np.array(list(resolved.values()), dtype=np.uint8)
+    base_r[index_at] = colours[:, 0]
+    base_g[index_at] = colours[:, 1]
+    base_b[index_at] = colours[:, 2]
+    base_a[index_at] = colours[:, 3]
+
+
+def decode_vectorized(data: bytes, size: int, desc: QoiHeader, channels: int = 0) -> bytes:
+    """Decodes Encoded Qoi Image into Raw pixels using NumPy
+
+    Drop-in for ``decode`` with identical output. A first pass only records
+    where each chunk starts. Chunk kinds, operands and pixel spans are then
+    read in bulk, DIFF/LUMA chains are resolved with cumulative sums from
+    the last literal, and runs are expanded with np.repeat. Only the
+    QOI_OP_INDEX chunks are resolved one after another, since their colour
+    depends on every chunk before them.
+
+    On 600x800 RGB images this decodes photos and mixed photo/UI content
+    about 2x faster than ``decode``. Streams where more than a quarter of
+    the chunks are QOI_OP_INDEX, typical of flat UI and palette images,
+    would decode up to 2x slower, so they are handed to ``decode`` after
+    the first pass; they still come out about 20% slower than calling
+    ``decode`` directly.
+
+    Args:
+        data (bytes): QOI encoded data; any buffer-protocol object
+        size (int): Size of the encoded data
+        desc (QoiHeader): QoiHeader to populate
+        channels (int): Desired color channels (0 to use the file's channels)
+
+    Returns:
+        bytes: Pixel data as bytearray, None on invalid input
+    """
+    p: int = 0
+
+    if (
+        data is None
+        or desc is None
+        or (channels != 0 and channels != 3 and channels != 4)
+        or size < QOI_HEADER_SIZE + len(qoi_padding)
+    ):
+        return None
+
+    bytes_data = _as_byte_view(data)
+
+    header_magic, p = qoiRead32(bytes_data, p)
+    desc.width, p = qoiRead32(bytes_data, p)
+    desc.height, p = qoiRead32(bytes_data, p)
+    desc.channels = bytes_data[p]
+    p += 1
+    desc.colorspace = bytes_data[p]
+    p += 1
+
+    if (
+        desc.width == 0
+        or desc.height == 0
+        or desc.channels < 3
+        or desc.channels > 4
+        or desc.colorspace > 1
+        or header_magic != QOI_MAGIC
+        or desc.height >= QOI_PIXELS_MAX / desc.width
+    ):
+        return None
+
+    if channels == 0:
+        channels = desc.channels
+
+    px_count = desc.width * desc.height
+    pixels = bytearray(px_count * channels)
+    out = np.frombuffer(pixels, dtype=np.uint8).reshape(px_count, channels)
+
+    starts = _tokenize(bytes_data, p, size - len(qoi_padding))
+    if starts.size == 0:
+        out[:] = (0, 0, 0, 255)[:channels]
+        return pixels
+
+    raw = np.frombuffer(bytes_data, dtype=np.uint8, count=size)
+    b1 = raw[starts]
+
+    # Drop the chunks after the one that completes the image
+    spans = np.take(np.array(QOI_CHUNK_SPAN, dtype=np.int64), b1)
+    covered = np.cumsum(spans)
+    chunk_count = min(int(np.searchsorted(covered, px_count)) + 1, starts.size)
+    starts = starts[:chunk_count]
+    b1 = b1[:chunk_count]
+    spans = spans[:chunk_count]
+    op1 = raw[starts + 1]
+
+    is_rgb = b1 == QOI_OP_RGB
+    is_rgba = b1 == QOI_OP_RGBA
+    is_literal = is_rgb | is_rgba
+    is_index = (b1 & QOI_MASK_2) == QOI_OP_INDEX
+    if np.count_nonzero(is_index) > _MAX_INDEX_SHARE * chunk_count:
+        return decode(data, size, desc, channels)
+    is_luma = (b1 & QOI_MASK_2) == QOI_OP_LUMA
+
+    # The colour of a chunk is the colour set by its last anchor (a literal
+    # or an index chunk) plus the deltas since then, all modulo 256. The
+    # extra last entry of each base array is the initial pixel.
+    rgb_anchor = _last_anchor(is_literal | is_index)
+    alpha_anchor = _last_anchor(is_rgba | is_index)
+
+    base_r = np.zeros(chunk_count + 1, dtype=np.uint8)
+    base_g = np.zeros(chunk_count + 1, dtype=np.uint8)
+    base_b = np.zeros(chunk_count + 1, dtype=np.uint8)
+    base_a = np.zeros(chunk_count + 1, dtype=np.uint8)
+    base_a[-1] = 255
+    base_r[:-1][is_literal] = op1[is_literal]
+    base_g[:-1][is_literal] = raw[starts[is_literal] + 2]
+    base_b[:-1][is_literal] = raw[starts[is_literal] + 3]
+    base_a[:-1][is_rgba] = raw[starts[is_rgba] + 4]
+
+    rel = []
+    for table, nibble in ((_DELTA_R, op1 >> 4), (_DELTA_G, None), (_DELTA_B, op1 & 0x0F)):
+        delta = table[b1]
+        if nibble is not None:
+            delta[is_luma] += nibble[is_luma]
+        total = np.cumsum(delta, dtype=np.uint8)
+        rel.append(total - np.append(total, np.uint8(0))[rgb_anchor])
+    rel_r, rel_g, rel_b = rel
+
+    index_at = np.flatnonzero(is_index)
+    if index_at.size:
+        _resolve_index_chunks(
+            index_at, b1, is_index, is_literal, is_rgba, rgb_anchor, alpha_anchor,
+            base_r, base_g, base_b, base_a, rel_r, rel_g, rel_b,
+        )
+
+    # The last chunk may run past the image, or the stream may end early
+    # and leave its colour repeated over the remaining pixels
+    spans[-1] += px_count - int(spans.sum())
+
+    out[:, 0] = np.repeat(base_r[rgb_anchor] + rel_r, spans)
+    out[:, 1] = np.repeat(base_g[rgb_anchor] + rel_g, spans)
+    out[:, 2] = np.repeat(base_b[rgb_anchor] + rel_b, spans)
+    if channels == 4:
+        out[:, 3] = np.repeat(base_a[alpha_anchor], spans)
+
+    return pixels
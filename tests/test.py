@@ -1,14 +1,63 @@
 import unittest
+import asyncio
+import hashlib
+import mmap
 import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import tempfile
 import numpy as np
 from io import BytesIO
 from pyqoi import (
-    QoiHeader, RGBA, QoiRGBA, 
+    QoiHeader, RGBA, QoiRGBA, QoiImage, QoiEncoder, QoiDecoder, QoiStats,
     encode, decode, read, write,
+    read_header, validate,
+    encode_array, decode_array, convert_channels, decode_thumbnail,
+    encode_into, max_encoded_size, QoiBufferPool, QoiCache,
+    encode_vectorized, decode_vectorized,
+    aencode, adecode, aread, awrite, amap,
+    encode_many, decode_many, convert_tree, validate_many, scan_tree,
+    QoiSeekIndex, build_index, write_indexed, decode_rows, decode_parallel,
+    encode_striped, decode_striped, join_striped, write_striped, read_striped,
+    QoiSequenceWriter, QoiSequenceReader,
     QOI_SRGB, QOI_LINEAR
 )
 
+def make_mixed_image(width, height, channels):
+    """Builds a deterministic image mixing runs, small deltas, repeats and alpha changes"""
+    state = 12345
+    palette = [(0, 0, 0, 0), (0, 0, 0, 255), (255, 0, 0, 255), (10, 200, 30, 128), (255, 255, 255, 255)]
+    r, g, b, a = 0, 0, 0, 255
+    data = bytearray()
+    for _ in range(width * height):
+        state = (state * 1103515245 + 12345) & 0x7FFFFFFF
+        choice = (state >> 16) % 10
+        if choice < 3:
+            pass  # Repeat the previous pixel
+        elif choice == 3:
+            r, g, b = (r + (state >> 8) % 3 - 1) & 0xFF, (g + 1) & 0xFF, (b - 1) & 0xFF
+        elif choice == 4:
+            r, g, b = (r + 20) & 0xFF, (g + 15) & 0xFF, (b + 12) & 0xFF
+        elif choice == 5:
+            r, g, b, a = palette[(state >> 4) % len(palette)]
+        elif choice == 6 and channels == 4:
+            a = (state >> 3) & 0xFF
+        else:
+            r, g, b = (state >> 3) & 0xFF, (state >> 11) & 0xFF, (state >> 19) & 0xFF
+        data.extend((r, g, b, a) if channels == 4 else (r, g, b))
+    return data
+
+
+# SHA-256 of the encoder output for make_mixed_image(width, height, channels)
+GOLDEN_ENCODINGS = {
+    (37, 23, 3): (2142, "d4201fe637a4ff983d403ef9c7453abe8edf53cbf736d6f4bc36c918f92caf59"),
+    (200, 3, 3): (1541, "cb5d359ddd94956eb8158f045869353eeb376e2e0815f6ba623e1acec5f62b75"),
+    (37, 23, 4): (2271, "9c1886c9970c966642cd16c9b98cc68cc85f766dee781c29116a4edd08207306"),
+    (200, 3, 4): (1637, "47b22a39e704cd6274da30c44a259b3697d2fbf6bf0f7d47dc6a0aa70fbf0ff4"),
+}
+
+
 class TestPyQOI(unittest.TestCase):
     
     def setUp(self):
@@ -243,6 +292,11 @@ class TestPyQOI(unittest.TestCase):
         result, length = encode(self.rgb_data, invalid_header, len(self.rgb_data))
         self.assertIsNone(result)
         
+        # Test with fewer pixels than the header describes
+        result, length = encode(bytes(30), QoiHeader(4, 4, 3, QOI_SRGB), 30)
+        self.assertIsNone(result)
+        self.assertEqual(length, 0)
+
         # Test decode with None data
         result = decode(None, 100, self.rgb_header)
         self.assertIsNone(result)
@@ -398,5 +452,910 @@ class TestPyQOI(unittest.TestCase):
             # We're not asserting anything about the result, just that it doesn't crash
         except Exception as e:
             self.fail(f"Decoder crashed on random data: {str(e)}")
+
+    def test_encode_golden_output(self):
+        """Test that the encoder output stays byte-identical across rewrites"""
+        for (width, height, channels), (length, digest) in GOLDEN_ENCODINGS.items():
+            data = make_mixed_image(width, height, channels)
+            header = QoiHeader(width, height, channels, QOI_SRGB)
+            encoded_data, encoded_len = encode(data, header, len(data))
+            self.assertEqual(encoded_len, length)
+            self.assertEqual(hashlib.sha256(bytes(encoded_data)).hexdigest(), digest)
+
+            decoded_data = decode(encoded_data, encoded_len, QoiHeader(0, 0, 0, 0))
+            self.assertEqual(bytes(decoded_data), bytes(data))
+
+        # Runs starting at the first pixel and fully transparent black
+        data = bytearray([0, 0, 0, 255] * 130 + [0, 0, 0, 0] * 70)
+        encoded_data, encoded_len = encode(data, QoiHeader(20, 10, 4, QOI_SRGB), len(data))
+        self.assertEqual(
+            bytes(encoded_data).hex(),
+            "716f6966000000140000000a04006afdfdc4ff00000000fdc60000000000000001",
+        )
+
+    def test_encode_delta_bounds(self):
+        """Test deltas just outside the QOI_OP_DIFF and QOI_OP_LUMA ranges"""
+        for second in ([97, 100, 100], [100, 97, 100], [100, 100, 97], [67, 67, 67]):
+            data = bytearray([100, 100, 100] + second)
+            header = QoiHeader(2, 1, 3, QOI_SRGB)
+            encoded_data, encoded_len = encode(data, header, len(data))
+            decoded_data = decode(encoded_data, encoded_len, QoiHeader(0, 0, 0, 0))
+            self.assertEqual(bytes(decoded_data), bytes(data))
+
+    def test_decode_buffer_types(self):
+        """Test decoding straight from bytes, bytearray, memoryview and mmap"""
+        import mmap
+
+        data = make_mixed_image(37, 23, 4)
+        encoded_data, encoded_len = encode(data, QoiHeader(37, 23, 4, QOI_SRGB), len(data))
+        write(self.rgba_file, data, QoiHeader(37, 23, 4, QOI_SRGB), len(data))
+
+        with open(self.rgba_file, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                sources = [bytes(encoded_data), bytearray(encoded_data), memoryview(encoded_data), mapped]
+                for source in sources:
+                    decode_header = QoiHeader(0, 0, 0, 0)
+                    decoded_data = decode(source, encoded_len, decode_header)
+                    self.assertEqual(bytes(decoded_data), bytes(data))
+                    self.assertEqual((decode_header.width, decode_header.height), (37, 23))
+            finally:
+                mapped.close()
+
+    def test_encode_vectorized_matches_encode(self):
+        """Test that the NumPy encoder produces the same bytes as encode"""
+        images = [
+            (make_mixed_image(37, 23, 3), QoiHeader(37, 23, 3, QOI_SRGB)),
+            (make_mixed_image(200, 3, 4), QoiHeader(200, 3, 4, QOI_SRGB)),
+            # Runs longer than 62 pixels, crossing rows and ending the image
+            (bytearray([9, 9, 9] * 150 + [1, 2, 3] * 50), QoiHeader(20, 10, 3, QOI_SRGB)),
+            (self.rgba_data, self.rgba_header),
+        ]
+        for data, header in images:
+            expected = encode(data, header, len(data))
+            result = encode_vectorized(data, header, len(data))
+            self.assertEqual(result[1], expected[1])
+            self.assertEqual(bytes(result[0]), bytes(expected[0]))
+
+        # Numpy arrays are read in place
+        array = np.frombuffer(bytes(images[1][0]), dtype=np.uint8).reshape(3, 200, 4)
+        result = encode_vectorized(array, images[1][1], array.size)
+        self.assertEqual(bytes(result[0]), bytes(encode(images[1][0], images[1][1], array.size)[0]))
+
+        # Crops are accepted like encode accepts them, short input is rejected
+        crop = array[:, 50:150]
+        crop_header = QoiHeader(100, 3, 4, QOI_SRGB)
+        self.assertEqual(
+            bytes(encode_vectorized(crop, crop_header, crop.size)[0]),
+            bytes(encode(crop, crop_header, crop.size)[0]),
+        )
+        data, header = images[0]
+        self.assertEqual(encode_vectorized(data[:-1], header, len(data) - 1), (None, 0))
+
+        result, length = encode_vectorized(None, self.rgb_header, len(self.rgb_data))
+        self.assertIsNone(result)
+
+    def test_decode_vectorized_matches_decode(self):
+        """Test that the NumPy decoder produces the same pixels as decode"""
+        # Noise with a repeated colour every 400 pixels gives long stretches
+        # between QOI_OP_INDEX chunks
+        noise = bytearray(np.random.RandomState(7).randint(0, 256, size=60 * 40 * 3, dtype=np.uint8))
+        for i in range(0, len(noise), 1200):
+            noise[i:i + 3] = b"\x10\x20\x30"
+        # A few colours in random order encode mostly as QOI_OP_INDEX,
+        # which is handed to the scalar decoder
+        palette = bytearray(np.random.RandomState(3).randint(0, 4, size=50 * 30, dtype=np.uint8).repeat(4) * 60)
+
+        images = [
+            (make_mixed_image(37, 23, 3), QoiHeader(37, 23, 3, QOI_SRGB)),
+            (make_mixed_image(200, 3, 4), QoiHeader(200, 3, 4, QOI_SRGB)),
+            (noise, QoiHeader(60, 40, 3, QOI_LINEAR)),
+            (palette, QoiHeader(50, 30, 4, QOI_SRGB)),
+            (self.solid_rgb_data, self.solid_rgb_header),
+        ]
+        for data, header in images:
+            encoded_data, encoded_len = encode(data, header, len(data))
+            for channels in (0, 3, 4):
+                expected = decode(encoded_data, encoded_len, QoiHeader(0, 0, 0, 0), channels)
+                decode_header = QoiHeader(0, 0, 0, 0)
+                result = decode_vectorized(encoded_data, encoded_len, decode_header, channels)
+                self.assertEqual(bytes(result), bytes(expected))
+                self.assertEqual(decode_header, header)
+
+            # Corrupted and truncated streams decode the same way too
+            corrupted = bytearray(encoded_data)
+            for i in range(20, encoded_len - 8, 17):
+                corrupted[i] = (corrupted[i] * 31 + 7) & 0xFF
+            for stream, length in ((corrupted, encoded_len), (corrupted[:encoded_len // 2], encoded_len // 2)):
+                expected = decode(stream, length, QoiHeader(0, 0, 0, 0))
+                result = decode_vectorized(stream, length, QoiHeader(0, 0, 0, 0))
+                if expected is None:
+                    self.assertIsNone(result)
+                else:
+                    self.assertEqual(bytes(result), bytes(expected))
+
+        self.assertIsNone(decode_vectorized(None, 100, QoiHeader(0, 0, 0, 0)))
+
+    def test_decode_run_edges(self):
+        """Test runs that overshoot the image and streams that end early"""
+        header = bytes.fromhex("716f6966" "00000002" "00000002" "03" "00")
+        padding = bytes(7) + b"\x01"
+
+        # A run of 62 pixels in a 4 pixel image
+        stream = header + bytes([0xFD]) + padding
+        decoded_data = decode(stream, len(stream), QoiHeader(0, 0, 0, 0), channels=4)
+        self.assertEqual(bytes(decoded_data), bytes([0, 0, 0, 255] * 4))
+
+        # One literal pixel, then the chunks run out
+        stream = header + bytes([0xFE, 1, 2, 3]) + padding
+        decoded_data = decode(stream, len(stream), QoiHeader(0, 0, 0, 0))
+        self.assertEqual(bytes(decoded_data), bytes([1, 2, 3] * 4))
+
+    def test_array_api(self):
+        """Test encoding and decoding NumPy arrays"""
+        for channels in (3, 4):
+            data = make_mixed_image(37, 23, channels)
+            array = np.frombuffer(bytes(data), dtype=np.uint8).reshape(23, 37, channels)
+
+            encoded_data = encode_array(array, colorspace=QOI_LINEAR)
+            header = QoiHeader(37, 23, channels, QOI_LINEAR)
+            self.assertEqual(bytes(encoded_data), bytes(encode(data, header, len(data))[0]))
+
+            decode_header = QoiHeader(0, 0, 0, 0)
+            decoded = decode_array(encoded_data, desc=decode_header)
+            self.assertEqual(decoded.shape, (23, 37, channels))
+            self.assertTrue(np.array_equal(decoded, array))
+            self.assertEqual(decode_header, header)
+
+            # The array is a view of the decode buffer
+            self.assertFalse(decoded.flags.owndata)
+            self.assertTrue(decoded.flags.writeable)
+
+        decoded = decode_array(encode_array(array), channels=3)
+        self.assertTrue(np.array_equal(decoded, array[:, :, :3]))
+
+        # Invalid input
+        self.assertIsNone(encode_array(np.zeros((4, 4), dtype=np.uint8)))
+        self.assertIsNone(encode_array(np.zeros((4, 4, 2), dtype=np.uint8)))
+        self.assertIsNone(encode_array(np.zeros((4, 4, 3), dtype=np.float32)))
+        self.assertIsNone(decode_array(None))
+        self.assertIsNone(decode_array(b"not a qoi image at all"))
+
+    def test_streaming_encoder(self):
+        """Test that feeding rows to QoiEncoder matches encode"""
+        for channels in (3, 4):
+            data = make_mixed_image(37, 23, channels)
+            header = QoiHeader(37, 23, channels, QOI_SRGB)
+            expected, _ = encode(data, header, len(data))
+
+            row_len = 37 * channels
+            for buffer_pixels in (1, 5, 65536):
+                sink = BytesIO()
+                with QoiEncoder(sink, header, buffer_pixels=buffer_pixels) as encoder:
+                    for y in range(23):
+                        encoder.feed(data[y * row_len:(y + 1) * row_len])
+                self.assertEqual(sink.getvalue(), bytes(expected))
+                self.assertEqual(encoder.bytes_written, len(expected))
+
+        # A run spanning every row, fed as numpy rows
+        image = np.full((10, 20, 3), 42, dtype=np.uint8)
+        sink = BytesIO()
+        with QoiEncoder(sink, QoiHeader(20, 10, 3, QOI_SRGB)) as encoder:
+            for row in image:
+                encoder.feed(row)
+        self.assertEqual(sink.getvalue(), bytes(encode(image.tobytes(), QoiHeader(20, 10, 3, QOI_SRGB), image.size)[0]))
+
+    def test_streaming_encoder_errors(self):
+        """Test QoiEncoder input validation"""
+        with self.assertRaises(ValueError):
+            QoiEncoder(BytesIO(), QoiHeader(0, 0, 3, QOI_SRGB))
+
+        encoder = QoiEncoder(BytesIO(), self.rgb_header)
+        with self.assertRaises(ValueError):
+            encoder.feed(b"\x00\x01")  # Not a whole pixel
+        with self.assertRaises(ValueError):
+            encoder.feed(bytes(3 * 5))  # More pixels than the header
+        encoder.feed(bytes(3 * 3))
+        with self.assertRaises(ValueError):
+            encoder.close()  # One pixel missing
+        encoder.feed(bytes(3))
+        encoder.close()
+        with self.assertRaises(ValueError):
+            encoder.feed(bytes(3))
+
+    def test_streaming_decoder(self):
+        """Test that QoiDecoder rows match decode"""
+        for channels in (3, 4):
+            data = make_mixed_image(37, 23, channels)
+            encoded, encoded_len = encode(data, QoiHeader(37, 23, channels, QOI_SRGB), len(data))
+            for out_channels in (0, 3, 4):
+                expected = decode(encoded, encoded_len, QoiHeader(0, 0, 0, 0), out_channels)
+                for read_size in (1, 3, 65536):
+                    decoder = QoiDecoder(BytesIO(encoded), out_channels, read_size)
+                    self.assertEqual(decoder.desc, QoiHeader(37, 23, channels, QOI_SRGB))
+                    rows = list(decoder)
+                    self.assertEqual(len(rows), 23)
+                    self.assertEqual(b"".join(rows), bytes(expected))
+                    self.assertIsNone(decoder.read_row())
+
+        # Runs crossing rows, decoded into a reused numpy row
+        encoded, _ = encode(self.solid_rgb_data, self.solid_rgb_header, len(self.solid_rgb_data))
+        decoder = QoiDecoder(BytesIO(encoded), read_size=2)
+        row = np.zeros((4, 3), dtype=np.uint8)
+        for y in range(4):
+            self.assertIs(decoder.read_row(row), row)
+            self.assertEqual(row.tobytes(), self.solid_rgb_data[y * 12:(y + 1) * 12])
+
+        # Truncated chunks repeat the last pixel, like decode
+        truncated = encoded[:-3]
+        self.assertEqual(
+            b"".join(QoiDecoder(BytesIO(truncated))),
+            bytes(decode(truncated, len(truncated), QoiHeader(0, 0, 0, 0))),
+        )
+
+        with self.assertRaises(ValueError):
+            QoiDecoder(BytesIO(b"qoif"))
+        with self.assertRaises(ValueError):
+            QoiDecoder(BytesIO(encoded), channels=2)
+
+    def test_decode_into_out(self):
+        """Test decoding and reading into a caller-provided buffer"""
+        data = make_mixed_image(37, 23, 4)
+        encoded, encoded_len = encode(data, QoiHeader(37, 23, 4, QOI_SRGB), len(data))
+        path = os.path.join(self.temp_dir, "mixed.qoi")
+        with open(path, "wb") as f:
+            f.write(encoded)
+
+        # One output allocation reused across images
+        out = np.zeros((23, 37, 4), dtype=np.uint8)
+        for _ in range(2):
+            self.assertIs(decode(encoded, encoded_len, QoiHeader(0, 0, 0, 0), out=out), out)
+            self.assertEqual(out.tobytes(), bytes(data))
+            out[:] = 0
+            self.assertIs(read(path, QoiHeader(0, 0, 0, 0), out=out), out)
+            self.assertEqual(out.tobytes(), bytes(data))
+
+        # A larger bytearray is filled from the start
+        out = bytearray(len(data) + 10)
+        self.assertIs(read(path, QoiHeader(0, 0, 0, 0), 4, out), out)
+        self.assertEqual(out[:len(data)], data)
+
+        # decode_array returns a view of out
+        out = np.zeros(37 * 23 * 3, dtype=np.uint8)
+        arr = decode_array(encoded, 3, out=out)
+        self.assertEqual(arr.shape, (23, 37, 3))
+        self.assertTrue(np.shares_memory(arr, out))
+
+        # Too small a buffer, or an empty file, is rejected
+        self.assertIsNone(decode(encoded, encoded_len, QoiHeader(0, 0, 0, 0), out=bytearray(10)))
+        empty = os.path.join(self.temp_dir, "empty.qoi")
+        open(empty, "wb").close()
+        self.assertIsNone(read(empty, QoiHeader(0, 0, 0, 0)))
+
+        os.remove(path)
+        os.remove(empty)
+
+    def test_batch(self):
+        """Test batch encoding, decoding and tree conversion in worker processes"""
+        src = os.path.join(self.temp_dir, "src")
+        dst = os.path.join(self.temp_dir, "dst")
+        os.makedirs(os.path.join(src, "sub"))
+        images = {}
+        for i, (name, channels) in enumerate([("a", 3), ("b", 4), (os.path.join("sub", "c"), 3)]):
+            arr = np.frombuffer(make_mixed_image(9 + i, 7, channels), dtype=np.uint8).reshape(7, 9 + i, channels)
+            images[name] = arr
+            np.save(os.path.join(src, name + ".npy"), arr)
+        with open(os.path.join(src, "bad.qoi"), "wb") as f:
+            f.write(b"not a qoi image")
+
+        jobs = [(os.path.join(src, name + ".npy"), os.path.join(src, name + ".qoi")) for name in images]
+        jobs.append((os.path.join(src, "missing.npy"), os.path.join(src, "missing.qoi")))
+        results = list(encode_many(jobs, workers=2))
+        self.assertEqual([r.source for r in results], [source for source, _ in jobs])
+        self.assertEqual([r.ok for r in results], [True, True, True, False])
+        self.assertIsNone(results[0].pixels)
+        self.assertEqual(results[1].desc, QoiHeader(10, 7, 4, QOI_SRGB))
+
+        # Pixels come back only when there is no target
+        results = list(decode_many([(target, None) for _, target in jobs[:3]], workers=2, chunksize=2, ordered=False))
+        self.assertEqual(len(results), 3)
+        for result in results:
+            name = os.path.relpath(result.source, src)[:-4]
+            np.testing.assert_array_equal(result.pixels, images[name])
+
+        # a.tif would also write a.qoi, after a.npy claimed it
+        with open(os.path.join(src, "a.tif"), "wb") as f:
+            f.write(b"not an image")
+        results = list(convert_tree(src, dst, workers=2))
+        self.assertEqual(len(results), 8)
+        self.assertEqual(sorted(os.path.basename(r.source) for r in results if not r.ok), ["a.tif", "bad.qoi"])
+        self.assertEqual(results[0].target, os.path.join(dst, ".", "a.qoi"))
+        for name, arr in images.items():
+            np.testing.assert_array_equal(np.load(os.path.join(dst, name + ".npy")), arr)
+            with open(os.path.join(dst, name + ".qoi"), "rb") as f:
+                np.testing.assert_array_equal(decode_array(f.read()), arr)
+
+        shutil.rmtree(src)
+        shutil.rmtree(dst)
+
+    def test_seek_index(self):
+        """Test random-access and parallel decoding through a seek index"""
+        data = make_mixed_image(37, 23, 4)
+        header = QoiHeader(37, 23, 4, QOI_SRGB)
+        encoded, encoded_len = encode(data, header, len(data))
+        row_len = 37 * 4
+
+        for step in (1, 4, 64):
+            index = build_index(encoded, encoded_len, step)
+            self.assertEqual(len(index.checkpoints), -(-23 // step))
+            self.assertEqual(QoiSeekIndex.from_bytes(index.to_bytes()), index)
+            for y0, y1 in ((0, 23), (5, 6), (7, 19), (22, 23)):
+                rows = decode_rows(encoded, encoded_len, index, y0, y1)
+                self.assertEqual(rows, data[y0 * row_len:y1 * row_len])
+            self.assertEqual(
+                decode_rows(encoded, encoded_len, index, 3, 9, channels=3),
+                decode(encoded, encoded_len, QoiHeader(0, 0, 0, 0), 3)[3 * 37 * 3:9 * 37 * 3],
+            )
+
+        # Runs crossing checkpoints
+        encoded_solid, solid_len = encode(self.solid_rgb_data, self.solid_rgb_header, len(self.solid_rgb_data))
+        index = build_index(encoded_solid, solid_len, 1)
+        self.assertEqual([cp.run for cp in index.checkpoints], [0, 12, 8, 4])
+        self.assertEqual(decode_rows(encoded_solid, solid_len, index, 2, 4), self.solid_rgb_data[24:])
+
+        # The .qoi file stays standard; the index sits beside it
+        path = os.path.join(self.temp_dir, "indexed.qoi")
+        index = write_indexed(path, data, header, len(data), step=5)
+        self.assertEqual(read(path, QoiHeader(0, 0, 0, 0)), data)
+        self.assertEqual(decode_parallel(path, workers=2), data)
+        self.assertEqual(decode_parallel(path, index, channels=3), decode(encoded, encoded_len, QoiHeader(0, 0, 0, 0), 3))
+
+        # Mismatched or corrupt indexes are rejected
+        self.assertIsNone(decode_rows(encoded_solid, solid_len, build_index(encoded, encoded_len), 0, 1))
+        self.assertIsNone(decode_rows(encoded, encoded_len, index, 5, 5))
+        self.assertIsNone(QoiSeekIndex.from_bytes(index.to_bytes()[:-1]))
+
+        # A stale index for another image of the same size is rejected
+        other = bytes(data[::-1])
+        other_encoded, other_len = encode(other, header, len(other))
+        self.assertIsNone(decode_rows(other_encoded, other_len, index, 0, 23))
+        write(path, other, header, len(other))
+        self.assertIsNone(decode_parallel(path, workers=1))
+        self.assertIsNone(decode_parallel(path, index, workers=1))
+        self.assertIsNone(decode_parallel(os.path.join(self.temp_dir, "missing.qoi"), index))
+
+        # Even when the encoded sizes happen to agree, the fingerprint differs
+        index.size = other_len
+        self.assertIsNone(decode_rows(other_encoded, other_len, index, 0, 23))
+
+        os.remove(path)
+        os.remove(path + ".qidx")
+
+    def test_striped(self):
+        """Test striped encoding, decoding and joining into a standard QOI image"""
+        for channels in (3, 4):
+            data = make_mixed_image(37, 23, channels)
+            header = QoiHeader(37, 23, channels, QOI_SRGB)
+            expected, _ = encode(data, header, len(data))
+            for band_rows, workers in ((5, 1), (23, 1), (100, 1), (4, 2)):
+                striped = encode_striped(data, header, len(data), band_rows, workers)
+                desc = QoiHeader(0, 0, 0, 0)
+                self.assertEqual(decode_striped(striped, desc, workers=workers), data)
+                self.assertEqual(desc, header)
+                self.assertEqual(
+                    decode_striped(striped, channels=7 - channels, workers=1),
+                    decode(expected, len(expected), QoiHeader(0, 0, 0, 0), 7 - channels),
+                )
+
+                sink = BytesIO()
+                self.assertEqual(join_striped(striped, sink), len(expected))
+                self.assertEqual(sink.getvalue(), bytes(expected))
+
+        path = os.path.join(self.temp_dir, "striped.qois")
+        write_striped(path, self.gradient_data, self.gradient_header, len(self.gradient_data), 3)
+        self.assertEqual(read_striped(path, QoiHeader(0, 0, 0, 0), workers=1), self.gradient_data)
+        os.remove(path)
+
+        # Invalid containers are rejected
+        striped = encode_striped(data, header, len(data), 5, workers=1)
+        self.assertIsNone(decode_striped(striped[:-1], workers=1))
+        self.assertIsNone(decode_striped(expected, workers=1))
+        self.assertIsNone(join_striped(b"qois", BytesIO()))
+        self.assertIsNone(encode_striped(data[:-1], header, len(data) - 1))
+
+    def test_header_probe_and_validate(self):
+        """Test reading the header alone and validating without decoding"""
+        data = make_mixed_image(37, 23, 4)
+        header = QoiHeader(37, 23, 4, QOI_SRGB)
+        encoded, _ = encode(data, header, len(data))
+        write(self.rgba_file, data, header, len(data))
+
+        self.assertEqual(read_header(encoded), header)
+        self.assertEqual(read_header(memoryview(encoded)[:14]), header)
+        self.assertEqual(read_header(self.rgba_file), header)
+        self.assertIsNone(read_header(encoded[:13]))
+        self.assertIsNone(read_header(b"qoix" + bytes(encoded[4:])))
+
+        desc = QoiHeader(0, 0, 0, 0)
+        self.assertTrue(validate(encoded, desc))
+        self.assertEqual(desc, header)
+        self.assertTrue(validate(self.rgba_file))
+        self.assertFalse(validate(encoded[:-1]))  # End marker cut
+        self.assertFalse(validate(encoded[:-9] + encoded[-8:]))  # Last chunk cut
+
+        # Pixel count off by one run pixel
+        runs, _ = encode(self.solid_rgb_data, self.solid_rgb_header, len(self.solid_rgb_data))
+        self.assertTrue(validate(runs))
+        broken = bytearray(runs)
+        broken[-9] += 1
+        self.assertFalse(validate(broken))
+
+        # Batch scan of a directory
+        tree = os.path.join(self.temp_dir, "scan")
+        os.makedirs(os.path.join(tree, "sub"))
+        for name, content in (("good.qoi", encoded), (os.path.join("sub", "bad.qoi"), broken), ("skip.txt", b"")):
+            with open(os.path.join(tree, name), "wb") as f:
+                f.write(content)
+        results = list(scan_tree(tree, workers=2, ordered=True))
+        self.assertEqual([os.path.relpath(r.source, tree) for r in results], ["good.qoi", os.path.join("sub", "bad.qoi")])
+        self.assertEqual([r.ok for r in results], [True, False])
+        self.assertEqual(results[0].desc, header)
+        self.assertEqual(results[1].desc, self.solid_rgb_header)
+        self.assertFalse(next(validate_many([os.path.join(tree, "missing.qoi")], workers=1)).ok)
+        shutil.rmtree(tree)
+
+    def test_bench(self):
+        """Test the benchmark corpora and baseline comparison"""
+        from pyqoi import bench
+
+        for name in bench.CORPORA:
+            img = bench.make_corpus(name, 33, 17)
+            self.assertEqual(img.shape[:2], (17, 33))
+            self.assertEqual(img.dtype, np.uint8)
+            np.testing.assert_array_equal(img, bench.make_corpus(name, 33, 17))
+
+        results = bench.run_benchmarks(["rgba_alpha"], ["16x8"], ["scalar", "vectorized"], repeat=1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual({r["channels"] for r in results}, {4})
+        self.assertEqual(bench.compare(results, results), [])
+
+        slower = [dict(r, mpps=r["mpps"] / 2, peak_bytes=r["peak_bytes"] * 2 + 1) for r in results]
+        self.assertEqual(len(bench.compare(slower, results)), 8)
+        self.assertEqual(bench.compare(slower, results, tolerance=10), [])
+
+    def test_stats(self):
+        """Test opcode statistics from encode and decode"""
+        data = make_mixed_image(37, 23, 4)
+        header = QoiHeader(37, 23, 4, QOI_SRGB)
+        stats = QoiStats()
+        encoded, encoded_len = encode(data, header, len(data), stats=stats)
+        self.assertEqual((encoded, encoded_len), encode(data, header, len(data)))
+
+        self.assertEqual(stats.pixels, 37 * 23)
+        self.assertEqual(sum(stats.op_bytes.values()), encoded_len - 14 - 8)
+        self.assertEqual(stats.index_hits, stats.op_counts["INDEX"])
+        self.assertEqual(stats.index_misses, sum(stats.op_counts[op] for op in ("DIFF", "LUMA", "RGB", "RGBA")))
+        self.assertEqual(sum(n * count for n, count in stats.run_lengths.items()) + stats.index_hits + stats.index_misses, 37 * 23)
+        self.assertLessEqual(stats.hash_collisions, stats.index_misses)
+        self.assertEqual(set(stats.phase_seconds), {"setup", "chunks", "finish", "analysis"})
+
+        decode_stats = QoiStats()
+        self.assertEqual(decode(encoded, encoded_len, QoiHeader(0, 0, 0, 0), 3, stats=decode_stats),
+                         decode(encoded, encoded_len, QoiHeader(0, 0, 0, 0), 3))
+        self.assertEqual(decode_stats.op_counts, stats.op_counts)
+        self.assertEqual(decode_stats.hash_collisions, stats.hash_collisions)
+
+        # Strided views encode row by row with stats as without
+        frame = np.zeros((30, 50, 4), dtype=np.uint8)
+        frame[3:26, 5:42] = np.frombuffer(data, dtype=np.uint8).reshape(23, 37, 4)
+        crop_stats = QoiStats()
+        self.assertEqual(encode(frame[3:26, 5:42], header, len(data), stats=crop_stats), (encoded, encoded_len))
+        self.assertEqual(crop_stats.op_counts, stats.op_counts)
+
+        # Counts accumulate, and export as plain data
+        runs, runs_len = encode(self.solid_rgb_data, self.solid_rgb_header, len(self.solid_rgb_data))
+        stats = QoiStats()
+        decode(runs, runs_len, QoiHeader(0, 0, 0, 0), stats=stats)
+        decode(runs, runs_len, QoiHeader(0, 0, 0, 0), stats=stats)
+        self.assertEqual(stats.run_lengths, {15: 2})
+        self.assertEqual(stats.as_dict()["op_counts"]["RGB"], 2)
+        self.assertEqual(stats.as_dict()["index_hit_rate"], 0.0)
+
+    def test_asyncio(self):
+        """Test the asyncio wrappers and the bounded-concurrency helper"""
+        data = make_mixed_image(37, 23, 3)
+        header = QoiHeader(37, 23, 3, QOI_SRGB)
+        path = os.path.join(self.temp_dir, "async.qoi")
+
+        async def round_trip(executor=None):
+            encoded, encoded_len = await aencode(data, header, len(data), executor)
+            desc = QoiHeader(0, 0, 0, 0)
+            self.assertEqual(await adecode(encoded, encoded_len, desc, executor=executor), data)
+            self.assertEqual(desc, header)
+
+            await awrite(path, data, header, len(data), executor)
+            desc = QoiHeader(0, 0, 0, 0)
+            self.assertEqual(await aread(path, desc, 4, executor), decode(encoded, encoded_len, QoiHeader(0, 0, 0, 0), 4))
+            self.assertEqual(desc, header)
+
+        asyncio.run(round_trip())
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            asyncio.run(round_trip(executor))  # Header comes back from the worker
+        os.remove(path)
+
+        async def pipeline():
+            running = 0
+            peak = 0
+            taken = []
+
+            async def produce():
+                for i in range(10):
+                    taken.append(i)
+                    yield i
+
+            async def work(i):
+                nonlocal running, peak
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.001 * (10 - i))
+                running -= 1
+                if i == 3:
+                    raise ValueError("bad job")
+                return i * i
+
+            results = []
+            async for job, result in amap(work, produce(), limit=3, return_exceptions=True):
+                # Backpressure: no more than limit jobs taken ahead of the results
+                self.assertLessEqual(len(taken) - len(results), 3)
+                results.append((job, result))
+            self.assertEqual(peak, 3)
+            self.assertEqual(sorted(job for job, _ in results), list(range(10)))
+            self.assertIsInstance(dict(results)[3], ValueError)
+            self.assertEqual(dict(results)[9], 81)
+
+            with self.assertRaises(ValueError):
+                async for _ in amap(work, range(5), limit=2):
+                    pass
+
+        asyncio.run(pipeline())
+
+    def test_opaque_alpha_and_convert_channels(self):
+        """Test opaque alpha reduction on encode and vectorized channel conversion"""
+        rgb = make_mixed_image(37, 23, 3)
+        rgba = convert_channels(rgb, 3, 4)
+        self.assertEqual(rgba[3::4], b"\xff" * (37 * 23))
+        self.assertEqual(convert_channels(rgba, 4, 3), rgb)
+        self.assertEqual(convert_channels(rgb, 3, 3), rgb)
+        self.assertIsNone(convert_channels(rgb[:-1], 3, 4))
+        self.assertIsNone(convert_channels(rgb, 2, 4))
+
+        header = QoiHeader(37, 23, 4, QOI_SRGB)
+        full, _ = encode(rgba, header, len(rgba))
+        reduced, reduced_len = encode(rgba, header, len(rgba), drop_opaque_alpha=True)
+        self.assertEqual(reduced[12], 3)
+        self.assertEqual(reduced[14:], full[14:])  # Same chunks, 3-channel header
+        self.assertEqual(header.channels, 4)
+        self.assertEqual(decode(reduced, reduced_len, QoiHeader(0, 0, 0, 0)), rgb)
+
+        arr = np.frombuffer(rgba, dtype=np.uint8).reshape(23, 37, 4)
+        self.assertEqual(encode_array(arr, drop_opaque_alpha=True), reduced)
+
+        # Any translucent pixel keeps the 4-channel header
+        rgba[-1] = 254
+        encoded, _ = encode(rgba, header, len(rgba), drop_opaque_alpha=True)
+        self.assertEqual(encoded[12], 4)
+
+    def test_encode_into_and_buffer_pool(self):
+        """Test encoding into caller buffers and the reusable buffer pool"""
+        data = make_mixed_image(37, 23, 4)
+        header = QoiHeader(37, 23, 4, QOI_SRGB)
+        expected, expected_len = encode(data, header, len(data))
+        self.assertIsInstance(expected, bytearray)
+        self.assertEqual(len(expected), expected_len)
+
+        size = max_encoded_size(header)
+        self.assertEqual(size, 37 * 23 * 5 + 14 + 8)
+        self.assertIsNone(max_encoded_size(QoiHeader(0, 23, 4, QOI_SRGB)))
+
+        for out in (bytearray(size), np.zeros(size + 5, dtype=np.uint8)):
+            n = encode_into(data, header, out)
+            self.assertEqual(n, expected_len)
+            self.assertEqual(bytes(out[:n]), bytes(expected))
+        self.assertEqual(encode_into(data, header, bytearray(size - 1)), 0)
+        self.assertEqual(encode_into(data[:-1], header, bytearray(size)), 0)
+
+        pool = QoiBufferPool(max_buffers=1)
+        buffers = set()
+        for _ in range(3):
+            with pool.encoded(data, header) as view:
+                self.assertIsInstance(view, memoryview)
+                self.assertEqual(bytes(view), bytes(expected))
+                buffers.add(id(view.obj))
+            with pool.decoded(expected, expected_len, QoiHeader(0, 0, 0, 0), 3) as view:
+                self.assertEqual(bytes(view), bytes(convert_channels(data, 4, 3)))
+                buffers.add(id(view.obj))
+        self.assertEqual(len(buffers), 1)  # One buffer served every call
+        self.assertRaises(ValueError, len, view)  # Released on exit
+
+        with pool.encoded(data, QoiHeader(0, 0, 4, QOI_SRGB)) as view:
+            self.assertIsNone(view)
+        with pool.decoded(b"junk", 4, QoiHeader(0, 0, 0, 0)) as view:
+            self.assertIsNone(view)
+
+    def test_channel_orders_and_strided_input(self):
+        """Test encoding strided views and alternate channel orders in place"""
+        rgba = np.frombuffer(make_mixed_image(37, 23, 4), dtype=np.uint8).reshape(23, 37, 4)
+        layouts = {
+            "RGB": [0, 1, 2], "BGR": [2, 1, 0],
+            "RGBA": [0, 1, 2, 3], "BGRA": [2, 1, 0, 3], "ARGB": [3, 0, 1, 2],
+        }
+        for order, columns in layouts.items():
+            channels = len(order)
+            pixels = np.ascontiguousarray(rgba[..., :channels])
+            header = QoiHeader(37, 23, channels, QOI_SRGB)
+            expected, _ = encode(pixels.tobytes(), header, pixels.size)
+
+            swapped = np.ascontiguousarray(rgba[..., columns])
+            self.assertEqual(encode(swapped.tobytes(), header, swapped.size, order=order)[0], expected)
+            self.assertEqual(encode_array(swapped, order=order), expected)
+
+            # Decoding straight into the layout
+            self.assertEqual(decode(expected, len(expected), QoiHeader(0, 0, 0, 0), order=order), swapped.tobytes())
+            np.testing.assert_array_equal(decode_array(expected, order=order), swapped)
+
+        # Crops of a larger frame, and views with strided pixels
+        frame = np.zeros((40, 60, 4), dtype=np.uint8)
+        frame[5:28, 10:47] = rgba
+        crop = frame[5:28, 10:47]
+        self.assertFalse(crop.flags.c_contiguous)
+        header = QoiHeader(37, 23, 4, QOI_SRGB)
+        expected, expected_len = encode(rgba.tobytes(), header, rgba.size)
+        self.assertEqual(encode(crop, header, crop.size)[0], expected)
+        self.assertEqual(encode_array(crop), expected)
+        out = bytearray(max_encoded_size(header))
+        self.assertEqual(encode_into(crop, header, out), expected_len)
+        self.assertEqual(out[:expected_len], expected)
+
+        wide = np.repeat(rgba, 2, axis=1)[:, ::2]
+        self.assertEqual(encode_array(wide), expected)
+        bgr_crop = frame[5:28, 10:47, 2::-1]
+        self.assertEqual(
+            encode_array(bgr_crop, order="BGR"),
+            encode_array(np.ascontiguousarray(rgba[..., :3])),
+        )
+
+        # Orders must match the channel count
+        self.assertEqual(encode(rgba.tobytes(), header, rgba.size, order="BGR"), (None, 0))
+        self.assertEqual(encode(rgba.tobytes(), header, rgba.size, order="XYZA"), (None, 0))
+        self.assertIsNone(decode(expected, expected_len, QoiHeader(0, 0, 0, 0), 3, order="BGRA"))
+        self.assertEqual(encode(crop[:-1], header, crop.size), (None, 0))
+
+    def test_sequence(self):
+        """Test a frame sequence storing only the changed regions"""
+        base = np.frombuffer(make_mixed_image(37, 23, 4), dtype=np.uint8).reshape(23, 37, 4)
+        frames = [base.copy() for _ in range(5)]
+        frames[1][3:5, 10:20] = (1, 2, 3, 255)
+        frames[2][0, 0] = (9, 9, 9, 9)
+        frames[2][20:23, 30:37] = 0
+        frames[3] = frames[2].copy()
+        frames[4][:] = 255
+        header = QoiHeader(37, 23, 4, QOI_SRGB)
+
+        for keyframe_interval in (0, 2):
+            sink = BytesIO()
+            writer = QoiSequenceWriter(sink, header, band_rows=8, keyframe_interval=keyframe_interval)
+            sizes = [writer.add_frame(frame) for frame in frames]
+            self.assertEqual(writer.bytes_written, len(sink.getvalue()))
+            if not keyframe_interval:
+                # Frame 3 repeats frame 2 and only stores an empty frame header
+                self.assertLess(sizes[1], sizes[0] // 4)
+                self.assertEqual(sizes[3], 5)
+
+            sink.seek(0)
+            reader = QoiSequenceReader(sink)
+            self.assertEqual(reader.desc, header)
+            decoded = [frame.copy() for frame in reader]
+            self.assertEqual(len(decoded), len(frames))
+            for got, expected in zip(decoded, frames):
+                np.testing.assert_array_equal(got, expected)
+
+        # Only the changed rows and columns of each band are stored
+        sink = BytesIO()
+        writer = QoiSequenceWriter(sink, header, band_rows=8)
+        writer.add_frame(frames[0])
+        writer.add_frame(frames[2])
+        sink.seek(0)
+        reader = QoiSequenceReader(sink)
+        reader.read_frame()
+        reader.read_frame()
+        self.assertEqual(reader.last_rects, [(0, 0, 1, 1), (30, 20, 7, 3)])
+
+        # Mismatched frames and broken containers are rejected
+        with self.assertRaises(ValueError):
+            writer.add_frame(base[..., :3])
+        with self.assertRaises(ValueError):
+            QoiSequenceWriter(BytesIO(), QoiHeader(0, 23, 4, QOI_SRGB))
+        with self.assertRaises(ValueError):
+            QoiSequenceReader(BytesIO(b"qoif" + bytes(10)))
+        with self.assertRaises(ValueError):
+            reader = QoiSequenceReader(BytesIO(sink.getvalue()[:-1]))
+            list(reader)
+
+    def test_lazy_image(self):
+        """Test QoiImage reads the header eagerly and decodes on first access"""
+        data = make_mixed_image(37, 23, 4)
+        header = QoiHeader(37, 23, 4, QOI_SRGB)
+        encoded, _ = encode(data, header, len(data))
+        path = os.path.join(self.temp_dir, "lazy.qoi")
+        write(path, data, header, len(data))
+
+        for source in (path, encoded, memoryview(encoded)):
+            image = QoiImage(source)
+            self.assertEqual(image.header, header)
+            self.assertEqual(image.shape, (23, 37, 4))
+            self.assertFalse(image.loaded)
+
+            arr = np.asarray(image)
+            self.assertTrue(image.loaded)
+            self.assertEqual(arr.tobytes(), data)
+            # No copy: the array shares the decoded buffer
+            self.assertTrue(np.shares_memory(arr, np.frombuffer(image.pixels, dtype=np.uint8)))
+            if sys.version_info >= (3, 12):
+                self.assertEqual(memoryview(image).tobytes(), data)
+
+            # Released pixels stay valid in the array and are decoded again on demand
+            image.release()
+            self.assertFalse(image.loaded)
+            self.assertEqual(arr.tobytes(), data)
+            self.assertEqual(image.pixels, data)
+
+        # Buffer sources are only viewed while decoding, so an mmap can be closed
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            image = QoiImage(mapped)
+            self.assertEqual(image.pixels, data)
+            mapped.close()
+        self.assertEqual(np.asarray(image).tobytes(), data)
+
+        rgb = QoiImage(encoded, channels=3)
+        self.assertEqual(np.asarray(rgb).shape, (23, 37, 3))
+        self.assertEqual(rgb.pixels, decode(encoded, len(encoded), QoiHeader(0, 0, 0, 0), 3))
+        os.remove(path)
+
+        with self.assertRaises(ValueError):
+            QoiImage(b"not a qoi image")
+        with self.assertRaises(ValueError):
+            QoiImage(encoded, channels=2)
+        with self.assertRaises(ValueError):
+            QoiImage(encoded[:20]).pixels
+
+    def test_cache(self):
+        """Test the decoded-image cache: hits, invalidation, byte budget and threads"""
+        data = make_mixed_image(37, 23, 4)
+        header = QoiHeader(37, 23, 4, QOI_SRGB)
+        encoded, size = encode(data, header, len(data))
+        path = os.path.join(self.temp_dir, "cached.qoi")
+        write(path, data, header, len(data))
+
+        cache = QoiCache(max_bytes=3 * len(data))
+        desc = QoiHeader(0, 0, 0, 0)
+        first = cache.read(path, desc)
+        self.assertEqual(first, data)
+        self.assertEqual(desc, header)
+        self.assertTrue(first.readonly)
+        desc = QoiHeader(0, 0, 0, 0)
+        self.assertEqual(cache.read(path, desc), data)
+        self.assertEqual(desc, header)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # A rewritten file is decoded again
+        flipped = bytes(data[::-1])
+        write(path, flipped, header, len(flipped))
+        os.utime(path, ns=(0, 10 ** 9))
+        self.assertEqual(cache.read(path, QoiHeader(0, 0, 0, 0)), flipped)
+        self.assertEqual(cache.misses, 2)
+
+        # Buffers are keyed by content, channels by their own entries
+        self.assertEqual(cache.decode(bytes(encoded), size, QoiHeader(0, 0, 0, 0)), data)
+        self.assertEqual(cache.decode(bytearray(encoded), size, QoiHeader(0, 0, 0, 0)), data)
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+        self.assertEqual(
+            cache.decode(encoded, size, QoiHeader(0, 0, 0, 0), 3),
+            decode(encoded, size, QoiHeader(0, 0, 0, 0), 3),
+        )
+
+        # The budget counts decoded bytes and evicts the least recently used
+        self.assertEqual(cache.evictions, 1)
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+        self.assertEqual(len(cache), 3)
+        self.assertIsNone(cache.read(os.path.join(self.temp_dir, "missing.qoi"), QoiHeader(0, 0, 0, 0)))
+        self.assertIsNone(cache.decode(bytes(30), 30, QoiHeader(0, 0, 0, 0)))
+        small = QoiCache(max_bytes=len(data) - 1)
+        self.assertEqual(small.decode(encoded, size, QoiHeader(0, 0, 0, 0)), data)
+        self.assertEqual((len(small), small.nbytes), (0, 0))
+        cache.clear()
+        self.assertEqual((len(cache), cache.nbytes), (0, 0))
+        os.remove(path)
+
+        # Concurrent lookups all see the same pixels
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda _: bytes(cache.decode(encoded, size, QoiHeader(0, 0, 0, 0))), range(32)))
+        self.assertTrue(all(r == data for r in results))
+        self.assertEqual(cache.hits + cache.misses, 39)
+        self.assertEqual(len(cache), 1)
+
+    def test_region_decode(self):
+        """Test decoding only a band of rows or a crop"""
+        for channels in (3, 4):
+            data = make_mixed_image(37, 23, channels)
+            header = QoiHeader(37, 23, channels, QOI_SRGB)
+            encoded, size = encode(data, header, len(data))
+            full = np.frombuffer(data, dtype=np.uint8).reshape(23, 37, channels)
+            for rows, cols in (((0, 5), None), ((20, 23), None), (None, (3, 4)), ((7, 19), (11, 36)), ((22, 23), (36, 37))):
+                expected = full[slice(*(rows or (0, 23))), slice(*(cols or (0, 37)))]
+                desc = QoiHeader(0, 0, 0, 0)
+                pixels = decode(encoded, size, desc, rows=rows, cols=cols)
+                self.assertEqual(pixels, expected.tobytes())
+                self.assertEqual(desc, header)
+                np.testing.assert_array_equal(decode_array(encoded, rows=rows, cols=cols), expected)
+
+                # out only needs room for the crop
+                out = np.zeros(expected.shape, dtype=np.uint8)
+                self.assertIs(decode(encoded, size, QoiHeader(0, 0, 0, 0), out=out, rows=rows, cols=cols), out)
+                np.testing.assert_array_equal(out, expected)
+
+            self.assertEqual(
+                decode(encoded, size, QoiHeader(0, 0, 0, 0), 7 - channels, rows=(2, 9), cols=(5, 30)),
+                decode_array(encoded, 7 - channels)[2:9, 5:30].tobytes(),
+            )
+
+        path = os.path.join(self.temp_dir, "region.qoi")
+        write(path, data, header, len(data))
+        self.assertEqual(read(path, QoiHeader(0, 0, 0, 0), rows=(0, 2)), full[:2].tobytes())
+        os.remove(path)
+
+        # Empty or out of range regions, and regions with stats, are rejected
+        for rows, cols in (((5, 5), None), ((0, 24), None), (None, (-1, 3)), (None, (30, 38))):
+            self.assertIsNone(decode(encoded, size, QoiHeader(0, 0, 0, 0), rows=rows, cols=cols))
+        self.assertIsNone(decode(encoded, size, QoiHeader(0, 0, 0, 0), stats=QoiStats(), rows=(0, 1)))
+
+    def test_thumbnail(self):
+        """Test decoding reduced images by sampling and by box averaging"""
+        data = make_mixed_image(37, 23, 4)
+        header = QoiHeader(37, 23, 4, QOI_SRGB)
+        encoded, size = encode(data, header, len(data))
+        full = np.frombuffer(data, dtype=np.uint8).reshape(23, 37, 4)
+        path = os.path.join(self.temp_dir, "thumb.qoi")
+        write(path, data, header, len(data))
+
+        for factor in (1, 2, 4, 8):
+            # Box averages are rounded, and partial at the right and bottom edges
+            boxed = np.empty((-(-23 // factor), -(-37 // factor), 4), dtype=np.uint8)
+            for y in range(boxed.shape[0]):
+                for x in range(boxed.shape[1]):
+                    block = full[y * factor : (y + 1) * factor, x * factor : (x + 1) * factor].reshape(-1, 4)
+                    boxed[y, x] = (block.sum(axis=0) + len(block) // 2) // len(block)
+
+            for source in (encoded, path, BytesIO(bytes(encoded))):
+                if isinstance(source, BytesIO):
+                    source.seek(0)
+                desc = QoiHeader(0, 0, 0, 0)
+                np.testing.assert_array_equal(decode_thumbnail(source, factor, desc=desc), full[::factor, ::factor])
+                self.assertEqual(desc, header)
+                if isinstance(source, BytesIO):
+                    source.seek(0)
+                np.testing.assert_array_equal(decode_thumbnail(source, factor, box=True), boxed)
+
+        np.testing.assert_array_equal(decode_thumbnail(encoded, 4, channels=3), full[::4, ::4, :3])
+        out = bytearray(6 * 10 * 4)
+        thumb = decode_thumbnail(encoded, 4, out=out)
+        self.assertEqual(bytes(out), thumb.tobytes())
+        os.remove(path)
+
+        self.assertIsNone(decode_thumbnail(encoded, 0))
+        self.assertIsNone(decode_thumbnail(encoded, 4, out=bytearray(10)))
+        self.assertIsNone(decode_thumbnail(b"not a qoi image", 2))
+        self.assertIsNone(decode_thumbnail(BytesIO(bytes(encoded[:10])), 2))
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
\ No newline at end of file